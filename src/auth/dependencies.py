@@ -1,16 +1,22 @@
 # src/auth/dependencies.py
+import asyncio
+import hashlib
+import hmac
 import logging
-from datetime import datetime
-from functools import lru_cache
-from typing import Annotated, Dict, List, Optional
-import pytz
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Annotated, AsyncGenerator, Callable, Dict, List, Optional, Tuple
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from firebase_admin import auth, firestore
 from firebase_admin.auth import ExpiredIdTokenError, InvalidIdTokenError, UserDisabledError
 from firebase_admin.exceptions import FirebaseError
+from sqlalchemy.orm import Session
 from src.auth.schemas import FirebaseUser
 from src.core.config import settings # Import the centralized settings
+from src.core.database import SessionLocal_mysql, SessionLocal_pg
 
 # --- Module-level logger ---
 logger = logging.getLogger(__name__)
@@ -27,55 +33,174 @@ API_SCOPES = {
     "admin": "Grants full administrative access."
 }
 
+# Role -> scopes mapping, resolved once at import time.
+_ROLE_SCOPES: Dict[str, Tuple[str, ...]] = {
+    "admin": tuple(API_SCOPES),
+    "manager": ("metadata:read", "metadata:write", "qc:read", "qc:write"),
+    "user": ("metadata:read", "qc:read"),
+}
+
 # --- Helper Functions for Cleaner Logic ---
 
+# The debug-bypass user never changes, so it is built once at import time.
+_DEBUG_USER_SCOPES = tuple(scope for scope in API_SCOPES if scope != "admin")
+_DEBUG_USER_CREATED_AT = datetime.now(timezone.utc)
+_DEBUG_USER = FirebaseUser.model_construct(
+    uid="debug_user_id",
+    email="debug@sqes.com",
+    email_verified=True,
+    display_name="Debug User",
+    photo_url="",
+    disabled=False,
+    role="user",
+    username="debuguser",
+    createdAt=_DEBUG_USER_CREATED_AT,
+    updatedAt=_DEBUG_USER_CREATED_AT,
+    is_admin=False,
+    scopes=_DEBUG_USER_SCOPES
+)
+
+# Resolved once at import; in production the bypass is disabled and the check is a single branch.
+_DEBUG_BYPASS_ENABLED: bool = settings.ENABLE_DEBUG_BYPASS_TOKEN
+_DEBUG_BYPASS_TOKEN: Optional[bytes] = settings.DEBUG_BYPASS_TOKEN.encode() if _DEBUG_BYPASS_ENABLED else None
+
 def _create_debug_user() -> FirebaseUser:
-    """Creates a mock admin user for development bypass. Controlled by settings."""
+    """Returns the mock user for development bypass. Controlled by settings."""
     logger.warning("!!! SECURITY WARNING: Using DEBUG_BYPASS_TOKEN !!!")
-    return FirebaseUser(
-        uid="debug_user_id",
-        id="debug_user_id",
-        email="debug@sqes.com",
-        email_verified=True,
-        display_name="Debug User",
-        photo_url="",
-        profilePicture="",
-        disabled=False,
-        role="user",
-        username="debuguser",
-        createdAt=datetime.now(pytz.utc), 
-        updatedAt=datetime.now(pytz.utc), 
-        is_admin=False,
-        scopes=[scope for scope in API_SCOPES.keys() if scope != "admin"]
-    )
+    return _DEBUG_USER
+
+# --- Firestore User Profile Cache ---
+# Bounded, TTL-based cache keyed by UID. Entries are stored as (data, fetched_at)
+# and kept in insertion/recency order so the oldest entry is evicted first.
+USER_CACHE_TTL_SECONDS: int = settings.USER_CACHE_TTL_SECONDS
+_USER_CACHE_MAX_ENTRIES = 10_000
+_user_cache: "OrderedDict[str, Tuple[Dict, float]]" = OrderedDict()
+_user_cache_lock = threading.Lock()
+
+def _user_cache_get(uid: str) -> Optional[Dict]:
+    """Returns the cached Firestore data for a UID, or None if missing or expired."""
+    with _user_cache_lock:
+        entry = _user_cache.get(uid)
+        if entry is None:
+            return None
+        data, fetched_at = entry
+        if time.monotonic() - fetched_at >= USER_CACHE_TTL_SECONDS:
+            del _user_cache[uid]
+            return None
+        _user_cache.move_to_end(uid)
+        return data
+
+def _user_cache_put(uid: str, data: Dict) -> None:
+    """Stores Firestore data for a UID, evicting the oldest entries when full."""
+    with _user_cache_lock:
+        _user_cache[uid] = (data, time.monotonic())
+        _user_cache.move_to_end(uid)
+        while len(_user_cache) > _USER_CACHE_MAX_ENTRIES:
+            _user_cache.popitem(last=False)
+
+def invalidate_user_cache(uid: str) -> None:
+    """Drops the cached Firestore data for a UID so the next request re-fetches it."""
+    with _user_cache_lock:
+        _user_cache.pop(uid, None)
 
-@lru_cache(maxsize=128) # Cache Firestore lookups to reduce latency
 def _get_user_details_from_firestore(uid: str) -> Dict:
-    """Fetches and returns user data from the Firestore 'Users' collection."""
+    """Fetches and returns user data from the Firestore 'Users' collection (TTL cached)."""
+    cached = _user_cache_get(uid)
+    if cached is not None:
+        return cached
+
     try:
         db = firestore.client()
         user_doc_ref = db.collection('Users').document(uid)
         user_doc = user_doc_ref.get()
 
         if user_doc.exists:
-            logger.debug(f"Fetched user details from Firestore for UID: {uid}")
-            return user_doc.to_dict()
+            logger.debug("Fetched user details from Firestore for UID: %s", uid)
+            data = user_doc.to_dict()
+        else:
+            logger.warning("Firestore document for user UID %s not found.", uid)
+            data = {}
+    except Exception as e:
+        logger.error("Error fetching user details from Firestore for UID %s: %s", uid, e, exc_info=True)
+        return {} # Return empty dict on error to prevent auth failure (not cached)
+
+    _user_cache_put(uid, data)
+    return data
+
+def _get_user_details_from_firestore_many(uids: List[str]) -> Dict[str, Dict]:
+    """
+    Fetches user data for several UIDs at once, keyed by UID (TTL cached).
+    Cache misses are resolved with a single batched `get_all` call instead of one
+    round-trip per document. UIDs that could not be fetched map to an empty dict.
+    """
+    results: Dict[str, Dict] = {}
+    misses: List[str] = []
+    for uid in dict.fromkeys(uids):
+        cached = _user_cache_get(uid)
+        if cached is not None:
+            results[uid] = cached
         else:
-            logger.warning(f"Firestore document for user UID {uid} not found.")
-            return {}
+            misses.append(uid)
+
+    if not misses:
+        return results
+
+    try:
+        db = firestore.client()
+        users = db.collection('Users')
+        snapshots = db.get_all([users.document(uid) for uid in misses])
+        for snap in snapshots:
+            data = snap.to_dict() if snap.exists else {}
+            if not snap.exists:
+                logger.warning("Firestore document for user UID %s not found.", snap.id)
+            _user_cache_put(snap.id, data)
+            results[snap.id] = data
+        logger.debug("Batch-fetched %d user document(s) from Firestore.", len(misses))
     except Exception as e:
-        logger.error(f"Error fetching user details from Firestore for UID {uid}: {e}", exc_info=True)
-        return {} # Return empty dict on error to prevent auth failure
+        logger.error("Error batch-fetching user details from Firestore: %s", e, exc_info=True)
+
+    for uid in misses:
+        results.setdefault(uid, {})
+    return results
+
+# --- Verified ID Token Cache ---
+# Decoded tokens keyed by a short blake2b digest of the raw token (a cache key, not a
+# security boundary). Entries are honoured until shortly before the token's own 'exp'
+# claim, so a client re-sending the same token skips JWT parsing and RSA verification.
+_TOKEN_CACHE_MAX_ENTRIES = 4096
+_TOKEN_EXPIRY_LEEWAY_SECONDS = 30
+_verified_token_cache: Dict[bytes, Tuple[Dict, float]] = {}
+_verified_token_cache_lock = threading.Lock()
 
-def _determine_scopes_from_role(role: str) -> List[str]:
-    """Determines the list of allowed scopes based on a user's role."""
-    if role == "admin":
-        return list(API_SCOPES.keys())
-    if role == "manager":
-        return ["metadata:read", "metadata:write", "qc:read", "qc:write"]
-    if role == "user":
-        return ["metadata:read", "qc:read"]
-    return []
+def _token_cache_key(token: str) -> bytes:
+    """Returns the cache key for a raw ID token."""
+    return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+def _token_cache_get(key: bytes) -> Optional[Dict]:
+    """Returns the cached decoded token, or None if missing or about to expire."""
+    entry = _verified_token_cache.get(key)
+    if entry is None:
+        return None
+    decoded, exp = entry
+    if exp - _TOKEN_EXPIRY_LEEWAY_SECONDS > time.time():
+        return decoded
+    with _verified_token_cache_lock:
+        _verified_token_cache.pop(key, None)
+    return None
+
+def _token_cache_put(key: bytes, decoded: Dict) -> None:
+    """Stores a verified decoded token, evicting the oldest entries (FIFO) when full."""
+    exp = decoded.get('exp')
+    if not exp:
+        return
+    with _verified_token_cache_lock:
+        _verified_token_cache[key] = (decoded, float(exp))
+        while len(_verified_token_cache) > _TOKEN_CACHE_MAX_ENTRIES:
+            del _verified_token_cache[next(iter(_verified_token_cache))]
+
+def _determine_scopes_from_role(role: str) -> Tuple[str, ...]:
+    """Determines the allowed scopes based on a user's role."""
+    return _ROLE_SCOPES.get(role, ())
 
 
 async def get_current_firebase_user(
@@ -84,6 +209,7 @@ async def get_current_firebase_user(
     """
     Dependency to verify Firebase ID token and return a user model.
     Handles token verification, debug bypass, and enriching user data from Firestore.
+    Blocking Firebase SDK calls are run in a worker thread so the event loop stays free.
     """
     if not credentials:
         raise HTTPException(
@@ -95,18 +221,24 @@ async def get_current_firebase_user(
     token = credentials.credentials
 
     # --- Secure Debug Bypass Logic ---
-    if settings.ENABLE_DEBUG_BYPASS_TOKEN and token == settings.DEBUG_BYPASS_TOKEN:
+    if _DEBUG_BYPASS_ENABLED and hmac.compare_digest(token.encode(), _DEBUG_BYPASS_TOKEN):
         return _create_debug_user()
 
     try:
-        # 1. Verify the Firebase ID token
-        logger.debug("Verifying Firebase ID token...")
-        decoded_token = auth.verify_id_token(token)
+        # 1. Verify the Firebase ID token (re-used from cache until shortly before 'exp')
+        token_key = _token_cache_key(token)
+        decoded_token = _token_cache_get(token_key)
+        if decoded_token is None:
+            logger.debug("Verifying Firebase ID token...")
+            decoded_token = await asyncio.to_thread(auth.verify_id_token, token)
+            _token_cache_put(token_key, decoded_token)
+            logger.info("Successfully verified token for UID: %s", decoded_token['uid'])
         uid = decoded_token['uid']
-        logger.info(f"Successfully verified token for UID: {uid}")
 
-        # 2. Get additional user details from Firestore (cached)
-        firestore_data = _get_user_details_from_firestore(uid)
+        # 2. Get additional user details from Firestore (cached; only a miss needs a thread)
+        firestore_data = _user_cache_get(uid)
+        if firestore_data is None:
+            firestore_data = await asyncio.to_thread(_get_user_details_from_firestore, uid)
 
         # 3. Consolidate user role (custom token claim takes precedence)
         role = decoded_token.get('role') or firestore_data.get('role', 'user')
@@ -114,8 +246,9 @@ async def get_current_firebase_user(
         # 4. Determine scopes based on the final role
         scopes = _determine_scopes_from_role(role)
 
-        # 5. Construct the user model
-        return FirebaseUser(
+        # 5. Construct the user model. Inputs come from a verified token and our own
+        #    Firestore document, so field validation is skipped on this hot path.
+        return FirebaseUser.model_construct(
             uid=uid,
             email=decoded_token.get('email'),
             email_verified=decoded_token.get('email_verified', False),
@@ -134,47 +267,122 @@ async def get_current_firebase_user(
             UserDisabledError: ("user_disabled", "User account has been disabled."),
         }
         error_code, detail = error_map.get(type(e), ("auth_error", "Firebase authentication failed."))
-        logger.warning(f"Authentication failed: {detail} (Code: {error_code})")
+        logger.warning("Authentication failed: %s (Code: %s)", detail, error_code)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail=detail,
             headers={"WWW-Authenticate": f"Bearer error=\"{error_code}\""},
         )
     except Exception as e:
-        logger.error(f"An unexpected error occurred during user authentication: {e}", exc_info=True)
+        logger.error("An unexpected error occurred during user authentication: %s", e, exc_info=True)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An internal error occurred during authentication.",
         )
 
 
+def _raise_missing_scope(current_user: FirebaseUser, missing: str) -> None:
+    """Logs and raises the 403 returned when a user lacks a required scope."""
+    logger.warning("Permission denied for user %s. Missing scope: %s.", current_user.uid, missing)
+    raise HTTPException(
+        status_code=status.HTTP_403_FORBIDDEN,
+        detail=f"Not enough permissions. Requires scope: '{missing}'.",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
 def require_scopes(required_scopes: List[str]):
     """
     A dependency factory that creates a dependency to check for required scopes.
+    Single-scope checks (the common case) get a specialised checker doing one membership test.
     """
-    def scope_checker(
-        current_user: Annotated[FirebaseUser, Depends(get_current_firebase_user)]
-    ) -> FirebaseUser:
-        
-        user_scopes = set(current_user.scopes)
-        for scope in required_scopes:
-            if scope not in user_scopes:
-                logger.warning(f"Permission denied for user {current_user.uid}. Missing scope: {scope}.")
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    detail=f"Not enough permissions. Requires scope: '{scope}'.",
-                    headers={"WWW-Authenticate": "Bearer"},
-                )
-        
-        logger.debug(f"Permission granted for user {current_user.uid} for scopes: {required_scopes}")
-        return current_user
-
-    return Depends(scope_checker)
+    required = frozenset(required_scopes)
+
+    if len(required) == 1:
+        (required_scope,) = required
+
+        def scope_checker(
+            current_user: Annotated[FirebaseUser, Depends(get_current_firebase_user)]
+        ) -> FirebaseUser:
+            if required_scope not in current_user.scope_set:
+                _raise_missing_scope(current_user, required_scope)
+            return current_user
+    else:
+        def scope_checker(
+            current_user: Annotated[FirebaseUser, Depends(get_current_firebase_user)]
+        ) -> FirebaseUser:
+            user_scopes = current_user.scope_set
+            if not required.issubset(user_scopes):
+                _raise_missing_scope(current_user, next(scope for scope in required_scopes if scope not in user_scopes))
+            logger.debug("Permission granted for user %s for scopes: %s", current_user.uid, required_scopes)
+            return current_user
+
+    # use_cache=True (FastAPI's default, kept explicit): every checker depends on the same
+    # `get_current_firebase_user` callable, so within one request the user is resolved
+    # once even when an endpoint stacks several scope dependencies.
+    return Depends(scope_checker, use_cache=True)
 
 
 # --- Pre-configured Dependencies for Common Use Cases ---
+# Built once at import. Endpoints should reuse these objects (or call `require_scopes`
+# at module level) rather than creating dependencies per request.
 admin_required = require_scopes(["admin"])
 metadata_write_required = require_scopes(["metadata:write"])
 metadata_read_required = require_scopes(["metadata:read"])
 qc_read_required = require_scopes(["qc:read"])
 qc_write_required = require_scopes(["qc:write"])
+
+
+# --- Combined Auth + Database Dependencies ---
+# FastAPI resolves sibling dependencies one after another. These dependencies run
+# token verification and the DB connection checkout (incl. pool pre-ping) concurrently.
+
+def _open_session(session_factory: Callable[[], Session]) -> Session:
+    """Creates a session and eagerly checks out its connection. Runs in a worker thread."""
+    session = session_factory()
+    try:
+        session.connection()
+    except Exception:
+        session.close()
+        raise
+    return session
+
+async def _auth_and_session(
+    credentials: HTTPAuthorizationCredentials,
+    session_factory: Callable[[], Session],
+) -> Tuple[FirebaseUser, Session]:
+    """Authenticates and opens a session concurrently. Closes the session if either step fails."""
+    user, session = await asyncio.gather(
+        get_current_firebase_user(credentials),
+        asyncio.to_thread(_open_session, session_factory),
+        return_exceptions=True,
+    )
+    if isinstance(user, BaseException) or isinstance(session, BaseException):
+        if isinstance(session, Session):
+            await asyncio.to_thread(session.close)
+        raise user if isinstance(user, BaseException) else session
+    return user, session
+
+async def auth_and_mysql_db(
+    credentials: Annotated[HTTPAuthorizationCredentials, Depends(bearer_scheme)]
+) -> AsyncGenerator[Tuple[FirebaseUser, Session], None]:
+    """Dependency yielding the authenticated user and a MySQL session, resolved concurrently."""
+    user, session = await _auth_and_session(credentials, SessionLocal_mysql)
+    try:
+        yield user, session
+    finally:
+        logger.debug("Closing MySQL database session.")
+        await asyncio.to_thread(session.close)
+
+async def auth_and_pg_db(
+    credentials: Annotated[HTTPAuthorizationCredentials, Depends(bearer_scheme)]
+) -> AsyncGenerator[Tuple[FirebaseUser, Session], None]:
+    """Dependency yielding the authenticated user and a PostgreSQL session, resolved concurrently."""
+    user, session = await _auth_and_session(credentials, SessionLocal_pg)
+    try:
+        yield user, session
+    finally:
+        logger.debug("Closing PostgreSQL database session.")
+        await asyncio.to_thread(session.close)
+
+AuthedMySQL = Annotated[Tuple[FirebaseUser, Session], Depends(auth_and_mysql_db)]
+AuthedPg = Annotated[Tuple[FirebaseUser, Session], Depends(auth_and_pg_db)]
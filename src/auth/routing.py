@@ -1,4 +1,5 @@
 # src/auth/routing.py
+import asyncio
 import logging # Import the standard logging library
 from fastapi import APIRouter, Depends, HTTPException, status
 from typing import Annotated, Optional # Keep Optional for BaseModel fields
@@ -6,11 +7,10 @@ from pydantic import BaseModel, EmailStr # Keep BaseModel and EmailStr
 from firebase_admin import auth # Keep Firebase Admin Auth
 
 # Import your custom dependencies and schemas
-from src.auth.dependencies import get_current_firebase_user, admin_required
+from src.auth.dependencies import get_current_firebase_user, admin_required, invalidate_user_cache
 from src.auth.schemas import FirebaseUser 
 
-# --- Logging Configuration ---
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+# --- Logging (configured once in src/main.py) ---
 logger = logging.getLogger(__name__) # Get a logger instance for this module
 
 # Create an API router for authentication-related endpoints
@@ -20,6 +20,7 @@ router = APIRouter(tags=["Authentication"])
 @router.get(
     "/me",
     response_model=FirebaseUser,
+    response_model_exclude_none=True,
     summary="Get Current Authenticated User Info",
     description="Retrieves the profile information of the currently authenticated Firebase user. "
                 "Requires a valid Firebase ID Token in the 'Authorization: Bearer' header."
@@ -37,7 +38,7 @@ async def read_current_user(
     Returns:
         FirebaseUser: The profile information of the authenticated user.
     """
-    logger.info(f"Accessed /api/auth/me. User UID: {current_user.uid}, Role: {current_user.role}, Email: {current_user.email}")
+    logger.info("Accessed /api/auth/me. User UID: %s, Role: %s, Email: %s", current_user.uid, current_user.role, current_user.email)
     return current_user
 
 # Pydantic model for setting a user's role
@@ -68,27 +69,29 @@ async def set_user_role(
         if request.uid:
             user_id_to_update = request.uid
         elif request.email:
-            user_record = auth.get_user_by_email(request.email)
+            user_record = await asyncio.to_thread(auth.get_user_by_email, request.email)
             user_id_to_update = user_record.uid
         
-        current_claims = auth.get_user(user_id_to_update).custom_claims or {}
+        user_to_update = await asyncio.to_thread(auth.get_user, user_id_to_update)
+        current_claims = user_to_update.custom_claims or {}
         new_claims = {**current_claims, "role": request.role}
 
-        auth.set_custom_user_claims(user_id_to_update, new_claims)
+        await asyncio.to_thread(auth.set_custom_user_claims, user_id_to_update, new_claims)
+        invalidate_user_cache(user_id_to_update)
         
         # Log success for auditing purposes
-        logger.info(f"Role set to '{request.role}' for user {user_id_to_update} by admin {admin_user.uid} ({admin_user.email}).")
+        logger.info("Role set to '%s' for user %s by admin %s (%s).", request.role, user_id_to_update, admin_user.uid, admin_user.email)
         return {"message": f"Role updated to '{request.role}' for user {user_id_to_update}. User needs to re-authenticate to get the new ID token."}
     
     except auth.UserNotFoundError:
-        logger.warning(f"Attempted to set role for non-existent user: {request.uid or request.email}")
+        logger.warning("Attempted to set role for non-existent user: %s", request.uid or request.email)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found for the provided UID or email."
         )
     except Exception as e:
         # Log errors with traceback for debugging in production logs
-        logger.error(f"Error setting user role for {request.uid or request.email}: {e}", exc_info=True)
+        logger.error("Error setting user role for %s: %s", request.uid or request.email, e, exc_info=True)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to set user role: An unexpected server error occurred." 
@@ -1,6 +1,6 @@
 # src/auth/schemas.py
-from pydantic import BaseModel, EmailStr, Field
-from typing import Optional, List
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr
+from typing import FrozenSet, Optional, Sequence
 from datetime import datetime 
 
 class FirebaseUser(BaseModel):
@@ -10,7 +10,7 @@ class FirebaseUser(BaseModel):
 
     Attributes:
         uid (str): The user's unique ID from Firebase, aliased from 'id' in Firestore.
-        email (Optional[EmailStr]): The user's email address.
+        email (Optional[str]): The user's email address (taken from the verified token, not re-validated).
         email_verified (bool): Indicates if the user's email has been verified.
         display_name (Optional[str]): The user's display name from Firebase Auth.
         photo_url (Optional[str]): The URL to the user's profile picture from Firebase Auth (aliased from 'profilePicture' in Firestore).
@@ -23,11 +23,11 @@ class FirebaseUser(BaseModel):
         updatedAt (Optional[datetime]): Timestamp when the user record was last updated in Firestore.
 
         is_admin (bool): Derived flag; True if the user's role is 'admin'.
-        scopes (List[str]): List of API access scopes granted to the user based on their role.
+        scopes (Sequence[str]): API access scopes granted to the user based on their role.
     """
     # Standard fields from Firebase ID token payload (some mapped with alias for clarity)
     uid: str = Field(..., alias="id", description="The user's unique ID from Firebase (maps to 'id' from Firestore).")
-    email: Optional[EmailStr] = Field(None, description="The user's email address, if available from Firebase Auth.")
+    email: Optional[str] = Field(None, description="The user's email address, if available from Firebase Auth.")
     email_verified: bool = Field(False, description="True if the user's email address has been verified by Firebase Auth.")
     display_name: Optional[str] = Field(None, description="The user's display name from Firebase Auth, if available.")
     photo_url: Optional[str] = Field(None, alias="profilePicture", description="The URL to the user's profile picture (maps to 'profilePicture' from Firestore).")
@@ -43,8 +43,17 @@ class FirebaseUser(BaseModel):
 
     # Authorization-specific fields, derived internally by the API
     is_admin: bool = Field(False, description="Derived: True if the user has administrative privileges (based on 'role').")
-    scopes: List[str] = Field([], description="Derived: List of API scopes granted to the user based on their role.")
+    scopes: Sequence[str] = Field((), description="Derived: API scopes granted to the user based on their role.")
 
-    class Config:
-        populate_by_name = True
-        from_attributes = True 
+    # Lazily built frozenset of `scopes`, shared by every scope check within a request
+    _scope_set: Optional[FrozenSet[str]] = PrivateAttr(None)
+
+    @property
+    def scope_set(self) -> FrozenSet[str]:
+        """The user's scopes as a frozenset, computed once per instance."""
+        if self._scope_set is None:
+            self._scope_set = frozenset(self.scopes)
+        return self._scope_set
+
+    # Frozen: a user object may be shared (e.g. the debug user) and must not be mutated.
+    model_config = ConfigDict(populate_by_name=True, from_attributes=True, frozen=True) 
@@ -1,5 +1,5 @@
 import os
-from typing import List
+from typing import List, Optional
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -20,21 +20,40 @@ class Settings(BaseSettings):
 
     # --- Security Settings ---
     CORS_ORIGINS: List[str] = Field(default=["*"], description="List of allowed CORS origins.")
+    CORS_ORIGIN_REGEX: Optional[str] = Field(None, description="Optional regex of allowed CORS origins (e.g. '^https://(app|admin)\\.example\\.com$'), matched in addition to CORS_ORIGINS.")
     ENABLE_DEBUG_BYPASS_TOKEN: bool = Field(False, description="Enable a debug bypass token for development. MUST be False in production.")
 
     # --- Database URLs ---
     DATABASE_URL_MYSQL: str = Field(..., description="Full connection string for the primary MySQL database.")
     DATABASE_URL_PG: str = Field(..., description="Full connection string for the primary PostgreSQL database.")
 
+    # --- Concurrency ---
+    THREADPOOL_WORKERS: int = Field(60, description="Worker threads available to sync endpoints and dependencies (database-backed routes run there).")
+
+    # --- Database Connection Pools (per engine) ---
+    DB_POOL_SIZE: int = Field(20, description="Number of persistent connections kept in each database pool.")
+    DB_MAX_OVERFLOW: int = Field(10, description="Extra connections a pool may open beyond DB_POOL_SIZE under load.")
+    DB_POOL_TIMEOUT: int = Field(3, description="Seconds to wait for a free pooled connection before failing the request.")
+    DB_POOL_RECYCLE: int = Field(1800, description="Seconds after which pooled connections are recycled.")
+
     # --- Firebase ---
     FIREBASE_SERVICE_ACCOUNT_KEY_PATH: str = Field(..., description="File path to the Firebase service account JSON key.")
 
     # --- Feature-specific Settings ---
     HEALTH_CHECK_CACHE_DURATION_SECONDS: int = Field(60, description="Cache duration for health check results.")
     ENABLE_HEALTH_CHECK_CACHE: bool = Field(True, description="Flag to enable/disable health check caching.")
+    MAX_REPLICA_LAG_SECONDS: float = Field(30.0, description="A PostgreSQL replica lagging further behind than this is reported DOWN by the readiness check.")
+    HEALTH_CHECK_TIMEOUT_SECONDS: float = Field(2.0, description="Maximum time a single readiness probe may take before its component is reported DOWN.")
+    METADATA_CACHE_TTL_SECONDS: int = Field(30, description="How long the serialized /pg-combined/all response is cached before the next request re-queries PostgreSQL.")
+    STATION_CACHE_TTL_SECONDS: int = Field(300, description="How long per-station metadata and sensor lookups are cached in-process before being re-queried.")
+    SITE_QUALITY_CACHE_TTL_SECONDS: int = Field(600, description="How long the in-memory snapshot of stations_site_quality is served before it is reloaded.")
+    QUALITY_HISTORY_CACHE_TTL_SECONDS: int = Field(3600, description="How long a station's quality history for a past year is cached in-process.")
+    QUALITY_HISTORY_CURRENT_YEAR_CACHE_TTL_SECONDS: int = Field(300, description="How long a station's quality history for the current year is cached in-process; kept short because new days are still being added.")
     IMAGE_STORAGE_BASE_PATH: str = Field("/home/geo2sqes/SQESDATA", description="Base filesystem path for storing images.")
     PSD_IMAGE_SUBDIR: str = Field("PDFimage", description="Subdirectory for PSD images.")
     SIGNAL_IMAGE_SUBDIR: str = Field("signal", description="Subdirectory for signal images.")
+    IMAGE_CACHE_MAX_AGE_SECONDS: int = Field(86400, description="Cache-Control max-age for PSD/signal images; clients revalidate with the image ETag afterwards.")
+    USER_CACHE_TTL_SECONDS: int = Field(300, description="How long Firestore user profiles are cached in-process before being re-fetched.")
 
     # --- Debugging and Development Settings ---
     DEBUG_BYPASS_TOKEN: str = Field("your-super-secret-debug-token", description="The token to bypass auth in debug mode. Should be complex.")
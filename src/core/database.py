@@ -1,14 +1,22 @@
-from sqlalchemy import create_engine
+import logging
+import math
+from typing import Dict
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import NullPool
 from src.core.config import settings 
 
+logger = logging.getLogger(__name__)
+
 # --- MySQL Database Configuration ---
 URL_DATABASE_MYSQL = settings.DATABASE_URL_MYSQL
 engine_mysql = create_engine(
     URL_DATABASE_MYSQL,
-    pool_size=10,        
-    max_overflow=20,     
-    pool_recycle=3600,   
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
     pool_pre_ping=True,  
     echo=False           
 )
@@ -19,11 +27,67 @@ Base_mysql = declarative_base()
 URL_DATABASE_PG = settings.DATABASE_URL_PG
 engine_pg = create_engine(
     URL_DATABASE_PG,
-    pool_size=10,        
-    max_overflow=20,     
-    pool_recycle=3600,   
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
     pool_pre_ping=True,  
     echo=False           
 )
 SessionLocal_pg = sessionmaker(autocommit=False, autoflush=False, bind=engine_pg)
-Base_pg = declarative_base() 
\ No newline at end of file
+Base_pg = declarative_base() 
+
+# --- Pool Instrumentation ---
+def pool_status(engine: Engine) -> Dict[str, int]:
+    """Returns a snapshot of an engine's connection pool usage."""
+    pool = engine.pool
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+    }
+
+def _log_checkout(engine_name: str, engine: Engine):
+    """Builds a 'checkout' listener that logs pool usage at DEBUG level."""
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("%s pool checkout: %s", engine_name, pool_status(engine))
+    return on_checkout
+
+event.listen(engine_mysql, "checkout", _log_checkout("MySQL", engine_mysql))
+event.listen(engine_pg, "checkout", _log_checkout("PostgreSQL", engine_pg))
+
+# --- Health-Check Engines ---
+# Dedicated engines for readiness probes. NullPool opens a fresh connection per probe,
+# so a silently dropped pooled connection can never yield a false UP, and probes never
+# pin or wait for connections that application traffic needs. At probe rates (~1/s)
+# the extra connect is negligible, and connect_timeout bounds it when a DB is down.
+# The probe query itself is bounded by the driver/server too (socket read/write
+# timeouts on MySQL, statement_timeout on PostgreSQL): asyncio.wait_for in the health
+# router only stops waiting, so without these a hung probe would keep its executor
+# thread busy until the database answered.
+_HC_TIMEOUT_SECONDS = max(1, math.ceil(settings.HEALTH_CHECK_TIMEOUT_SECONDS))
+_HC_TIMEOUT_MS = max(1, int(settings.HEALTH_CHECK_TIMEOUT_SECONDS * 1000))
+
+engine_mysql_hc = create_engine(
+    URL_DATABASE_MYSQL,
+    poolclass=NullPool,
+    connect_args={
+        "connect_timeout": 1,
+        "read_timeout": _HC_TIMEOUT_SECONDS,
+        "write_timeout": _HC_TIMEOUT_SECONDS,
+    },
+    echo=False
+)
+SessionLocal_mysql_hc = sessionmaker(autocommit=False, autoflush=False, bind=engine_mysql_hc)
+
+engine_pg_hc = create_engine(
+    URL_DATABASE_PG,
+    poolclass=NullPool,
+    connect_args={
+        "connect_timeout": 1,
+        "options": f"-c statement_timeout={_HC_TIMEOUT_MS}",
+    },
+    echo=False
+)
+SessionLocal_pg_hc = sessionmaker(autocommit=False, autoflush=False, bind=engine_pg_hc)
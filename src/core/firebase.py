@@ -44,4 +44,27 @@ def initialize_firebase(service_account_key_path: str):
             raise
     else:
         # This case is less common but handles redundant calls gracefully
-        logger.info("Firebase Admin SDK already initialized. Skipping initialization.")
\ No newline at end of file
+        logger.info("Firebase Admin SDK already initialized. Skipping initialization.")
+
+
+# Google rotates the ID-token signing keys roughly every few hours; refreshing well
+# inside that window keeps the certificate cache warm for token verification.
+ID_TOKEN_CERTS_REFRESH_SECONDS = 45 * 60
+
+def warm_id_token_certs() -> None:
+    """
+    Pre-fetches Google's public certificates used to verify Firebase ID tokens.
+    `auth.verify_id_token` otherwise downloads them lazily on the first request
+    (and again after they expire), adding an HTTPS round-trip to that request.
+    The certificates are fetched through the SDK's own caching HTTP session, so the
+    next verification is served from that cache. Blocking; run it in a worker thread.
+    """
+    from google.oauth2 import id_token
+
+    # Mirrors how firebase_admin wires its verifier. These are private SDK internals,
+    # valid for the firebase-admin and google-auth versions pinned in requirements.txt;
+    # re-check them whenever either pin moves.
+    client = auth._get_client(firebase_admin.get_app())
+    verifier = client._token_verifier
+    id_token._fetch_certs(verifier.request, verifier.id_token_verifier.cert_url)
+    logger.debug("Firebase ID token certificates fetched.")
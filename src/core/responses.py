@@ -0,0 +1,27 @@
+# src/core/responses.py
+from typing import Any
+import orjson
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+from pydantic import TypeAdapter
+
+
+class ORJSONUTCResponse(ORJSONResponse):
+    """
+    ORJSONResponse that serializes datetimes natively in C with UTC rendered as 'Z'
+    (naive datetimes are treated as UTC) and allows non-string dict keys.
+    Used as the application's default response class.
+    """
+    OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=self.OPTIONS)
+
+
+def adapter_json_response(adapter: TypeAdapter, value: Any) -> Response:
+    """
+    Serializes `value` with a prebuilt TypeAdapter straight into the response body,
+    skipping FastAPI's response_model pass (dump to Python objects, then re-encode).
+    Aliases are applied, as FastAPI does by default.
+    """
+    return Response(content=adapter.dump_json(value, by_alias=True), media_type="application/json")
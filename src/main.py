@@ -1,16 +1,20 @@
+import asyncio
 import logging
 import sys
 import time
 from contextlib import asynccontextmanager
 from typing import Dict, Any
+import anyio.to_thread
 from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from src.core.config import settings
-from src.core.database import engine_mysql, engine_pg
-from src.core.firebase import initialize_firebase
+from src.core.database import engine_mysql, engine_mysql_hc, engine_pg, engine_pg_hc
+from src.core.firebase import ID_TOKEN_CERTS_REFRESH_SECONDS, initialize_firebase, warm_id_token_certs
+from src.core.responses import ORJSONUTCResponse
 from src.schemas import RootResponse
 from src.auth import router as auth_router
 from src.modules.health import router as health_router
+from src.modules.health.routing import run_timestamp_ticker
 from src.modules.metadata import router as metadata_router
 from src.modules.qualitycontrol import router as qcresult_router
 
@@ -25,6 +29,16 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+async def _refresh_id_token_certs_periodically() -> None:
+    """Keeps Google's ID-token certificates warm so no request pays for the fetch."""
+    while True:
+        await asyncio.sleep(ID_TOKEN_CERTS_REFRESH_SECONDS)
+        try:
+            await asyncio.to_thread(warm_id_token_certs)
+        except Exception as e:
+            logger.warning("Failed to refresh Firebase ID token certificates: %s", e)
+
+
 # --- Lifespan Context Manager (Modern FastAPI Startup/Shutdown) ---
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -35,33 +49,63 @@ async def lifespan(app: FastAPI):
     logger.info("Application startup initiated.")
     app.state.start_time = time.time()
 
+    # Sync endpoints (all database-backed routes) run in AnyIO's worker threadpool;
+    # size it explicitly rather than relying on the library default of 40.
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_WORKERS
+    logger.info("Worker threadpool size set to %d.", settings.THREADPOOL_WORKERS)
+
     logger.info("Initializing Firebase Admin SDK...")
     try:
         initialize_firebase(settings.FIREBASE_SERVICE_ACCOUNT_KEY_PATH)
         logger.info("Firebase Admin SDK initialization complete.")
     except Exception as e:
-        logger.critical(f"CRITICAL ERROR: Failed to initialize Firebase Admin SDK. Application will not start: {e}", exc_info=True)
+        logger.critical("CRITICAL ERROR: Failed to initialize Firebase Admin SDK. Application will not start: %s", e, exc_info=True)
         raise
 
+    try:
+        await asyncio.to_thread(warm_id_token_certs)
+        logger.info("Firebase ID token certificates pre-fetched.")
+    except Exception as e:
+        # Not fatal: verification will fetch the certificates lazily on first use.
+        logger.warning("Could not pre-fetch Firebase ID token certificates: %s", e)
+    # Build the OpenAPI schema now; FastAPI caches it on the app, so the first
+    # /openapi.json (and /docs) request no longer walks every route and model.
+    if app.openapi_url:
+        app.openapi()
+
+    certs_refresh_task = asyncio.create_task(_refresh_id_token_certs_periodically())
+    timestamp_ticker_task = asyncio.create_task(run_timestamp_ticker())
+
     yield
 
+    certs_refresh_task.cancel()
+    timestamp_ticker_task.cancel()
+    # Let both tasks finish unwinding before the engines they may touch are disposed.
+    await asyncio.gather(certs_refresh_task, timestamp_ticker_task, return_exceptions=True)
+
     # --- Application Shutdown ---
     logger.info("Application shutdown initiated.")
     if engine_mysql:
         logger.info("Disposing of MySQL database connections...")
         try:
-            await engine_mysql.dispose()
+            engine_mysql.dispose()
             logger.info("MySQL database connections disposed successfully.")
         except Exception as e:
-            logger.error(f"Error disposing of MySQL connections: {e}", exc_info=True)
+            logger.error("Error disposing of MySQL connections: %s", e, exc_info=True)
 
     if engine_pg:
         logger.info("Disposing of PostgreSQL database connections...")
         try:
-            await engine_pg.dispose()
+            engine_pg.dispose()
             logger.info("PostgreSQL database connections disposed successfully.")
         except Exception as e:
-            logger.error(f"Error disposing of PostgreSQL connections: {e}", exc_info=True)
+            logger.error("Error disposing of PostgreSQL connections: %s", e, exc_info=True)
+
+    for hc_engine in (engine_mysql_hc, engine_pg_hc):
+        try:
+            hc_engine.dispose()
+        except Exception as e:
+            logger.error("Error disposing of health-check connections: %s", e, exc_info=True)
 
     logger.info("Application shutdown complete.")
 
@@ -71,8 +115,10 @@ app = FastAPI(
     title=settings.APP_NAME,
     description="API for managing SQES Data, secured with Firebase Authentication.",
     version=settings.APP_VERSION,
+    openapi_url="/openapi.json" if settings.SHOW_DOCS else None,
     docs_url="/docs" if settings.SHOW_DOCS else None,
     redoc_url="/redoc" if settings.SHOW_DOCS else None,
+    default_response_class=ORJSONUTCResponse,
     lifespan=lifespan
 )
 
@@ -80,11 +126,15 @@ app = FastAPI(
 # --- Middleware Configuration ---
 
 # 1. CORS Middleware (Cross-Origin Resource Sharing)
+# Credentials are only allowed with an explicit allowlist; a wildcard origin combined
+# with credentials is rejected by browsers per the CORS spec.
+_cors_allow_all = "*" in settings.CORS_ORIGINS
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=settings.CORS_ORIGINS, 
-    allow_credentials=True,
-    allow_methods=["*"],  
+    allow_origins=tuple(settings.CORS_ORIGINS),
+    allow_origin_regex=settings.CORS_ORIGIN_REGEX,
+    allow_credentials=not _cors_allow_all,
+    allow_methods=("GET", "POST", "PUT", "DELETE", "OPTIONS"),
     allow_headers=["*"], 
 )
 
@@ -92,17 +142,23 @@ app.add_middleware(
 @app.middleware("http")
 async def add_process_time_header(request: Request, call_next):
     """
-    Middleware to add a custom X-Process-Time header to all responses
+    Middleware to add a custom X-Process-Time header (in microseconds) to all responses
     and log request details for performance monitoring.
+    Health probes are passed straight through to keep that path as cheap as possible.
     """
-    start_time = time.time()
+    if request.url.path.startswith("/api/health"):
+        return await call_next(request)
+
+    start_ns = time.perf_counter_ns()
     response = await call_next(request)
-    process_time = time.time() - start_time
-    response.headers["X-Process-Time"] = str(process_time)
+    elapsed_us = (time.perf_counter_ns() - start_ns) // 1000
+    response.headers["X-Process-Time"] = str(elapsed_us)
     
-    logger.info(
-        f'Request: {request.method} {request.url.path} - Completed in {process_time:.4f}s - Status: {response.status_code}'
-    )
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(
+            'Request: %s %s - Completed in %.4fs - Status: %s',
+            request.method, request.url.path, elapsed_us / 1_000_000, response.status_code
+        )
     return response
 
 
@@ -1,14 +1,18 @@
 # src/modules/health/routing.py
+import asyncio
 import logging 
-from fastapi import APIRouter, HTTPException, status, Request
-from typing import Dict, Any, Union
+import re
+from fastapi import APIRouter, Query, status, Request, Response
+from typing import Dict, Any, Optional, Tuple
 import firebase_admin
+import orjson
 from sqlalchemy import text
 from sqlalchemy.exc import OperationalError, SQLAlchemyError
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from src.core.config import settings
-from src.core.database import SessionLocal_mysql, SessionLocal_pg
+from src.core.database import SessionLocal_mysql_hc, SessionLocal_pg_hc, engine_mysql, engine_pg, pool_status
 
 # Get a logger instance for this module
 logger = logging.getLogger(__name__)
@@ -16,12 +20,84 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 
 # --- Health Check Caching Configuration ---
-_cached_ready_result: Union[Dict[str, Any], None] = None
-_last_ready_check_time: float = 0.0
+# The cached readiness result is stored as one (checked_at, status, head, tail) tuple so
+# readers always see a consistent snapshot. `head`/`tail` are the pre-serialized JSON
+# around the two per-request fields (timestamp_utc, response_time_ms), so a cache hit
+# only encodes those two values. The lock makes a refresh single-flight: when the cache
+# is stale, only the first request runs the probes and concurrent ones reuse its result.
+_ready_cache: Optional[Tuple[float, str, bytes, bytes]] = None
+_ready_refresh_lock = asyncio.Lock()
 # Cache duration should ideally come from settings for easy configuration
 CACHE_DURATION_SECONDS: int = settings.HEALTH_CHECK_CACHE_DURATION_SECONDS
 
+# --- Shared UTC Timestamp ---
+# Health endpoints report a millisecond ISO-8601 timestamp. A background ticker (started
+# in the app lifespan) refreshes it every TIMESTAMP_TICK_SECONDS so requests only read a
+# string; if the ticker is not running, the value is recomputed once it goes stale.
+TIMESTAMP_TICK_SECONDS: float = 0.1
+_cached_timestamp: Tuple[float, str] = (0.0, "")
+
+def _format_utc_timestamp() -> str:
+    """Formats the current UTC time as e.g. '2025-01-01T12:00:00.000Z'."""
+    return datetime.now(timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+
+def _refresh_timestamp() -> str:
+    """Recomputes and stores the shared timestamp."""
+    global _cached_timestamp
+    timestamp = _format_utc_timestamp()
+    _cached_timestamp = (time.monotonic(), timestamp)
+    return timestamp
+
+def _current_timestamp() -> str:
+    """Returns the shared timestamp, recomputing it if the ticker has fallen behind."""
+    refreshed_at, timestamp = _cached_timestamp
+    if time.monotonic() - refreshed_at > TIMESTAMP_TICK_SECONDS * 2:
+        return _refresh_timestamp()
+    return timestamp
+
+async def run_timestamp_ticker() -> None:
+    """Keeps the shared health timestamp fresh. Started and cancelled by the app lifespan."""
+    while True:
+        _refresh_timestamp()
+        await asyncio.sleep(TIMESTAMP_TICK_SECONDS)
+
+# --- Probe Executor ---
+# Blocking probes run on a small dedicated pool, so a burst of /ready calls (or a hung
+# database) can never exhaust the threads that serve regular sync endpoints.
+_PROBE_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="health-probe")
+
+PROBE_TIMEOUT_SECONDS: float = settings.HEALTH_CHECK_TIMEOUT_SECONDS
+
+async def _run_probe(component_name: str, func, *args) -> Dict[str, Any]:
+    """
+    Runs a blocking probe on the dedicated health-probe executor, bounded by
+    PROBE_TIMEOUT_SECONDS. A probe that does not finish in time is reported DOWN.
+    """
+    future = asyncio.get_running_loop().run_in_executor(_PROBE_EXECUTOR, func, *args)
+    try:
+        return await asyncio.wait_for(future, timeout=PROBE_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        logger.error(f"Health probe for {component_name} timed out after {PROBE_TIMEOUT_SECONDS}s.")
+        return {"status": "DOWN", "message": "timeout"}
+
 # --- Helper Function for Database Connectivity Check ---
+MAX_REPLICA_LAG_SECONDS: float = settings.MAX_REPLICA_LAG_SECONDS
+# Time since the last replayed transaction is not lag when the primary is idle, so a
+# replica that has replayed everything it received reports 0.
+_PG_PROBE_SQL = text(
+    "SELECT 1, pg_is_in_recovery(), "
+    "CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE extract(epoch from now() - pg_last_xact_replay_timestamp()) END::float8"
+)
+_MYSQL_PROBE_SQL = text("SELECT 1, @@read_only")
+# Display names for probe messages
+_COMPONENT_PRETTY: Dict[str, str] = {
+    "mysql_database": "Mysql Database",
+    "postgresql_database": "Postgresql Database",
+}
+# First line of a DB error, cut before any " on '<host>'" detail
+_DB_ERROR_RE = re.compile(r"^([^\n]*?)(?: on '|\n|$)")
+
 def _check_database_connectivity(
     db_session_factory, 
     component_name: str
@@ -30,67 +106,108 @@ def _check_database_connectivity(
     Checks connectivity to a database using the provided session factory.
 
     Args:
-        db_session_factory: A callable (e.g., SessionLocal_mysql or SessionLocal_pg)
+        db_session_factory: A callable (e.g., SessionLocal_mysql_hc or SessionLocal_pg_hc)
                             that returns a context manager yielding a SQLAlchemy Session.
         component_name: The name of the database component (e.g., "mysql_database").
 
     Returns:
-        A dictionary with "status" ("UP" or "DOWN") and a "message" for the component.
+        A dictionary with "status" ("UP" or "DOWN") and a "message" for the component,
+        plus replication details: "in_recovery" (and "replica_lag_seconds" on a replica)
+        for PostgreSQL, "read_only" for MySQL. A PostgreSQL replica lagging more than
+        MAX_REPLICA_LAG_SECONDS is reported DOWN.
     """
+    pretty_name = _COMPONENT_PRETTY[component_name]
     try:
         with db_session_factory() as db_session:
-            db_session.execute(text("SELECT 1")).scalar()
+            # One round trip returns both liveness and replication state.
+            if db_session.get_bind().dialect.name == "postgresql":
+                _, in_recovery, replica_lag = db_session.execute(_PG_PROBE_SQL).one()
+                if in_recovery and replica_lag is not None and replica_lag > MAX_REPLICA_LAG_SECONDS:
+                    logger.error(f"Database connectivity check for {component_name}: DOWN. Replica lag {replica_lag:.1f}s.")
+                    return {
+                        "status": "DOWN",
+                        "message": f"{pretty_name} replica is lagging by {replica_lag:.1f}s.",
+                        "in_recovery": True,
+                        "replica_lag_seconds": round(replica_lag, 1),
+                    }
+                extra = {"in_recovery": bool(in_recovery)}
+                if in_recovery and replica_lag is not None:
+                    extra["replica_lag_seconds"] = round(replica_lag, 1)
+            else:
+                _, read_only = db_session.execute(_MYSQL_PROBE_SQL).one()
+                extra = {"read_only": bool(read_only)}
             logger.info(f"Database connectivity check for {component_name}: UP. Successfully connected.")
             return {
                 "status": "UP",
-                "message": f"Successfully connected to {component_name.replace('_', ' ').title()}."
+                "message": f"Successfully connected to {pretty_name}.",
+                **extra,
             }
     except (OperationalError, SQLAlchemyError) as e:
-        error_message_full = str(e)
-        display_message = error_message_full.split('\n', 1)[0]
-        if " on '" in display_message:
-            display_message = display_message.split(" on '")[0]
+        # Prefer the short DBAPI message over SQLAlchemy's verbose wrapper (SQL, background link)
+        orig = getattr(e, "orig", None)
+        display_message = _DB_ERROR_RE.match(str(orig) if orig is not None else str(e)).group(1)
         
         logger.error(f"Database connectivity check for {component_name}: DOWN. Error: {display_message}", exc_info=False) 
         return {
             "status": "DOWN",
-            "message": f"Failed to connect to {component_name.replace('_', ' ').title()}: {display_message}"
+            "message": f"Failed to connect to {pretty_name}: {display_message}"
         }
 
+def _check_firebase() -> Dict[str, Any]:
+    """Checks that the Firebase Admin SDK has been initialized."""
+    # Firebase is already initialized, but you could add a test connection if needed.
+    if not firebase_admin._apps: # Basic check
+        return {"status": "DOWN", "message": "Firebase Admin SDK not initialized."}
+    return {"status": "UP", "message": "Firebase Admin SDK initialized."}
+
+# --- Pre-serialized Response Templates ---
+# The root and liveness payloads are constant apart from the timestamp (and uptime), so
+# their static JSON is encoded once and only the dynamic values are spliced in.
+_ROOT_HEAD: bytes = orjson.dumps({
+    "service": "SQES API 2025 Health Module",
+    "message": "Welcome to the Health API module! Check /live or /ready for status.",
+    "version": settings.APP_VERSION,
+})[:-1] + b',"timestamp_utc":'
+_ROOT_TAIL: bytes = b"," + orjson.dumps({
+    "endpoints": {
+        "/live": "Liveness probe: checks if the application is running.",
+        "/ready": "Readiness probe: checks if the application is ready to serve requests (including external dependencies)."
+    },
+    "status": "HEALTH_API_ROOT_UP"
+})[1:]
+
+_LIVE_HEAD: bytes = orjson.dumps({
+    "service": "SQES API 2025",
+    "status": "UP",
+    "version": settings.APP_VERSION,
+})[:-1] + b',"timestamp_utc":'
+_LIVE_TAIL: bytes = b"," + orjson.dumps({
+    "message": "Application is live and responsive."
+})[1:]
+
 # --- Root Health Check Endpoint ---
-@router.get("/", status_code=status.HTTP_200_OK, response_model=Dict[str, Any])
-async def health_api_root() -> Dict[str, Any]:
+@router.get("/", status_code=status.HTTP_200_OK, response_model=None)
+async def health_api_root() -> Response:
     """
     Root endpoint for the health API module.
     Provides a general overview and directs to specific health check endpoints.
     """
-    current_time_utc = datetime.now(timezone.utc)
-    timestamp = current_time_utc.isoformat(timespec='milliseconds') + 'Z'
-
     logger.info("Health API root accessed.")
-    return {
-        "service": "SQES API 2025 Health Module",
-        "message": "Welcome to the Health API module! Check /live or /ready for status.",
-        "version": settings.APP_VERSION,
-        "timestamp_utc": timestamp,
-        "endpoints": {
-            "/live": "Liveness probe: checks if the application is running.",
-            "/ready": "Readiness probe: checks if the application is ready to serve requests (including external dependencies)."
-        },
-        "status": "HEALTH_API_ROOT_UP"
-    }
+    return Response(
+        content=_ROOT_HEAD + orjson.dumps(_current_timestamp()) + _ROOT_TAIL,
+        media_type="application/json",
+    )
 
 # --- Liveness Check Endpoint ---
-@router.get("/live", status_code=status.HTTP_200_OK, response_model=Dict[str, Any])
-async def liveness_check(request: Request) -> Dict[str, Any]:
+@router.get("/live", status_code=status.HTTP_200_OK, response_model=None)
+async def liveness_check(request: Request) -> Response:
     """
     API Liveness Check Endpoint.
 
     Provides a simple check to indicate if the application process is running and responsive.
     This endpoint does not check external dependencies (like databases).
     """
-    current_time_utc = datetime.now(timezone.utc)
-    timestamp = current_time_utc.isoformat(timespec='milliseconds') + 'Z'
+    timestamp = _current_timestamp()
 
     # Safely get uptime from app.state (set in main.py lifespan)
     uptime_seconds = 0
@@ -100,72 +217,78 @@ async def liveness_check(request: Request) -> Dict[str, Any]:
         logger.warning("Application startup time (app.state.start_time) not set. Uptime will be 0.")
 
     logger.info("Liveness check endpoint accessed. Status: UP.")
-    return {
-        "service": "SQES API 2025",
-        "status": "UP",
-        "version": settings.APP_VERSION,
-        "timestamp_utc": timestamp,
-        "uptime_seconds": uptime_seconds,
-        "message": "Application is live and responsive."
-    }
+    return Response(
+        content=b"".join((_LIVE_HEAD, orjson.dumps(timestamp), b',"uptime_seconds":', b"%d" % uptime_seconds, _LIVE_TAIL)),
+        media_type="application/json",
+    )
 
 # --- Readiness Check Endpoint ---
-@router.get("/ready", status_code=status.HTTP_200_OK, response_model=Dict[str, Any])
-async def readiness_check(request: Request) -> Dict[str, Any]:
-    """
-    API Readiness Check Endpoint.
+def _get_fresh_ready_cache(now: float) -> Optional[Tuple[float, str, bytes, bytes]]:
+    """Returns the cached readiness snapshot if caching is enabled and it is still fresh."""
+    cache = _ready_cache
+    if settings.ENABLE_HEALTH_CHECK_CACHE and cache is not None and now - cache[0] < CACHE_DURATION_SECONDS:
+        return cache
+    return None
 
-    Provides a comprehensive overview of the application's health,
-    including connectivity to core services like MySQL and PostgreSQL databases.
-    Returns 200 OK if all critical components are operational,
-    otherwise returns 503 Service Unavailable (via HTTPException).
-    """
-    global _cached_ready_result, _last_ready_check_time
+def _split_ready_payload(health_response: Dict[str, Any]) -> Tuple[bytes, bytes]:
+    """Pre-serializes the static parts of a readiness payload around its per-request fields."""
+    head = orjson.dumps({
+        "service": health_response["service"],
+        "status": health_response["status"],
+        "version": health_response["version"],
+    })[:-1]
+    tail = orjson.dumps({
+        "uptime_seconds": health_response["uptime_seconds"],
+        "components": health_response["components"],
+    })[1:]
+    return head, tail
 
-    start_request_time = time.time()
-    current_time_utc = datetime.now(timezone.utc)
-    timestamp = current_time_utc.isoformat(timespec='milliseconds') + 'Z'
-
-    # --- Check Cache ---
-    if settings.ENABLE_HEALTH_CHECK_CACHE and (start_request_time - _last_ready_check_time < CACHE_DURATION_SECONDS):
-        if _cached_ready_result:
-            # Update timestamp and response_time for the cached result
-            cached_result = _cached_ready_result.copy()
-            cached_result["timestamp_utc"] = timestamp
-            cached_result["response_time_ms"] = round((start_request_time - _last_ready_check_time) * 1000, 2)
-            logger.info("Returning cached readiness check result.")
-            
-            # If cached result indicates degradation/down, still raise 503
-            if cached_result["status"] in ["DEGRADED", "DOWN"]:
-                raise HTTPException(
-                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                    detail=cached_result
-                )
-            return cached_result
+def _render_ready_response(service_status: str, head: bytes, tail: bytes, timestamp: str, response_time_ms: float) -> Response:
+    """
+    Assembles the readiness body from pre-serialized parts. Degraded results keep the
+    `{"detail": {...}}` shape (status 503) that HTTPException used to produce.
+    """
+    body = b"".join((
+        head,
+        b',"timestamp_utc":', orjson.dumps(timestamp),
+        b',"response_time_ms":', orjson.dumps(response_time_ms),
+        b",", tail,
+    ))
+    # Always return 503 for critical failures for readiness probes
+    # If any critical component is DOWN or the service is DEGRADED, the HTTP status code is 503.
+    if service_status in ("DEGRADED", "DOWN"):
+        logger.warning(f"Readiness check: Service status is {service_status}. Returning 503.")
+        return Response(
+            content=b'{"detail":' + body + b"}",
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            media_type="application/json",
+        )
+    logger.info(f"Readiness check: Service status is {service_status}. Returning 200.")
+    return Response(content=body, status_code=status.HTTP_200_OK, media_type="application/json")
 
-    # --- Perform Actual Health Checks if cache is stale or empty ---
+async def _run_readiness_checks(request: Request, start_request_time: float, timestamp: str) -> Dict[str, Any]:
+    """Probes every dependency and builds the readiness payload."""
     service_status = "UP"
     components_status: Dict[str, Dict[str, Any]] = {}
 
-    # Check MySQL Database Connectivity
-    mysql_status = _check_database_connectivity(SessionLocal_mysql, "mysql_database")
-    components_status["mysql_database"] = mysql_status
-    if mysql_status["status"] == "DOWN":
-        service_status = "DEGRADED" 
-
-    # Check PostgreSQL Database Connectivity
-    pg_status = _check_database_connectivity(SessionLocal_pg, "postgresql_database")
-    components_status["postgresql_database"] = pg_status
-    if pg_status["status"] == "DOWN":
-        service_status = "DEGRADED" 
-    
-    # Firebase is already initialized, but you could add a test connection if needed.
-    if not firebase_admin._apps: # Basic check
-        components_status["firebase_admin_sdk"] = {"status": "DOWN", "message": "Firebase Admin SDK not initialized."}
-        service_status = "DEGRADED"
-    else:
-        components_status["firebase_admin_sdk"] = {"status": "UP", "message": "Firebase Admin SDK initialized."}
+    # Run all dependency probes concurrently on the dedicated probe executor.
+    probes = {
+        "mysql_database": _run_probe("mysql_database", _check_database_connectivity, SessionLocal_mysql_hc, "mysql_database"),
+        "postgresql_database": _run_probe("postgresql_database", _check_database_connectivity, SessionLocal_pg_hc, "postgresql_database"),
+        "firebase_admin_sdk": _run_probe("firebase_admin_sdk", _check_firebase),
+    }
+    results = await asyncio.gather(*probes.values(), return_exceptions=True)
+    for component_name, result in zip(probes, results):
+        if isinstance(result, BaseException):
+            logger.error(f"Health probe for {component_name} raised unexpectedly: {result}")
+            result = {"status": "DOWN", "message": f"Health probe failed: {type(result).__name__}"}
+        components_status[component_name] = result
+        if result["status"] == "DOWN":
+            service_status = "DEGRADED"
 
+    # Snapshot of the application connection pools (not the probe engines)
+    components_status["mysql_database"]["pool"] = pool_status(engine_mysql)
+    components_status["postgresql_database"]["pool"] = pool_status(engine_pg)
 
     end_request_time = time.time()
     response_time_ms = round((end_request_time - start_request_time) * 1000, 2)
@@ -177,7 +300,7 @@ async def readiness_check(request: Request) -> Dict[str, Any]:
     else:
         logger.warning("request.app.state.start_time is not set. Uptime will be 0.")
 
-    health_response = {
+    return {
         "service": "SQES API 2025",
         "status": service_status,
         "version": settings.APP_VERSION,
@@ -187,21 +310,64 @@ async def readiness_check(request: Request) -> Dict[str, Any]:
         "components": components_status
     }
 
-    # Cache the result
-    _cached_ready_result = health_response
-    _last_ready_check_time = end_request_time
+@router.get("/ready", status_code=status.HTTP_200_OK, response_model=None)
+async def readiness_check(
+    request: Request,
+    ignore_dependencies: bool = Query(
+        False,
+        alias="ignore-dependencies",
+        description="Skip external dependency checks and report only that the application can serve requests.",
+    ),
+) -> Response:
+    """
+    API Readiness Check Endpoint.
 
-    # Always return 503 for critical failures for readiness probes
-    # If any critical component is DOWN, the overall status should be 503
-    # If it's DEGRADED, it might still return 200, but the status will reflect degradation.
-    # The logic here is: if the overall 'service_status' is "DEGRADED" or "DOWN",
-    # the HTTP status code should be 503. Otherwise, 200.
-    if service_status in ["DEGRADED", "DOWN"]:
-        logger.warning(f"Readiness check: Service status is {service_status}. Returning 503.")
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail=health_response
+    Provides a comprehensive overview of the application's health,
+    including connectivity to core services like MySQL and PostgreSQL databases.
+    Returns 200 OK if all critical components are operational,
+    otherwise returns 503 Service Unavailable with the report under `detail`.
+
+    Two modes are supported:
+    - `/ready` (default): full dependency check; intended for the Kubernetes readinessProbe.
+    - `/ready?ignore-dependencies=1`: application-only check with no database or Firebase
+      traffic; intended for external load balancers that poll at a high rate.
+    """
+    global _ready_cache
+
+    start_request_time = time.time()
+    timestamp = _current_timestamp()
+
+    if ignore_dependencies:
+        uptime_seconds = 0
+        if hasattr(request.app.state, 'start_time'):
+            uptime_seconds = int(start_request_time - request.app.state.start_time)
+        head, tail = _split_ready_payload({
+            "service": "SQES API 2025",
+            "status": "UP",
+            "version": settings.APP_VERSION,
+            "uptime_seconds": uptime_seconds,
+            "components": {},
+        })
+        return _render_ready_response(
+            "UP", head, tail, timestamp, round((time.time() - start_request_time) * 1000, 2)
         )
 
-    logger.info(f"Readiness check: Service status is {service_status}. Returning 200.")
-    return health_response
\ No newline at end of file
+    cache = _get_fresh_ready_cache(start_request_time)
+    if cache is None:
+        async with _ready_refresh_lock:
+            # Another request may have refreshed the cache while we waited for the lock.
+            cache = _get_fresh_ready_cache(time.time())
+            if cache is None:
+                health_response = await _run_readiness_checks(request, start_request_time, timestamp)
+                head, tail = _split_ready_payload(health_response)
+                _ready_cache = (time.time(), health_response["status"], head, tail)
+                return _render_ready_response(
+                    health_response["status"], head, tail, timestamp, health_response["response_time_ms"]
+                )
+
+    # Serve the cached result with a fresh timestamp and the age of the cached check
+    checked_at, service_status, head, tail = cache
+    logger.info("Returning cached readiness check result.")
+    return _render_ready_response(
+        service_status, head, tail, timestamp, round((start_request_time - checked_at) * 1000, 2)
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import BigInteger, Column, Integer, String, Numeric, DateTime, ForeignKey
+from sqlalchemy import BigInteger, Column, Integer, String, Numeric, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from src.core.database import Base_mysql, Base_pg
 
@@ -64,17 +64,22 @@ class MetadataPostgreSQL(Base_pg):
 
 class StationSensorPostgreSQL(Base_pg):
     __tablename__ = 'stations_sensor'
-    # id = Column(Integer, primary_key=True, nullable=False)
-    code = Column(String, nullable=True, primary_key = True)
-    location = Column(String, nullable=True, primary_key = True)
-    channel = Column(String, nullable=True, primary_key = True)
+    # Composite primary key (code, location, channel); an empty location code is stored as ''.
+    code = Column(String(10), primary_key=True, nullable=False)
+    location = Column(String(10), primary_key=True, nullable=False, server_default="")
+    channel = Column(String(10), primary_key=True, nullable=False)
     sensor = Column(String, nullable=True)
 
     def __repr__(self):
-        return f"<StationSensor(id={self.id}, code='{self.code}', location='{self.location}', channel='{self.channel}', sensor='{self.sensor}')>"
+        return f"<StationSensor(code='{self.code}', location='{self.location}', channel='{self.channel}', sensor='{self.sensor}')>"
 
 class StationSensorLatencyPostgreSQL(Base_pg):
     __tablename__ = "stations_sensor_latency"
+    __table_args__ = (
+        # Serves the /latency/{sta}/{channel} range query (sta, channel, datetime BETWEEN ...);
+        # INCLUDE(latency) makes it covering, so the planner can use an index-only scan.
+        Index("ix_latency_sta_chan_dt", "sta", "channel", "datetime", postgresql_include=["latency"]),
+    )
 
     id = Column(Integer, primary_key=True, nullable=False)
     net = Column(String(50), nullable=True)
@@ -1,13 +1,73 @@
+import logging
+import threading
+import time
 from datetime import datetime as datetime_cls
-from typing import List, Optional, Dict
-from fastapi import APIRouter, Query
+from typing import Any, Callable, Iterable, List, Optional, Dict, Tuple, Union
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from pydantic import TypeAdapter
+from src.core.config import settings
 from src.core.dependencies import DbMySQL, DbPg
+from src.core.responses import adapter_json_response
 from src.modules.metadata import services, schemas
-from src.auth.dependencies import metadata_read_required
+from src.auth.dependencies import admin_required, metadata_read_required
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(dependencies=[metadata_read_required])
 
 
+# --- Response Cache ---
+# Serialized JSON bodies keyed by request path, stored as (cached_at, body). Cached
+# endpoints take no query parameters, so the query string is deliberately not part of
+# the key (otherwise arbitrary ?x=... variants would each pin a full body in memory).
+# Entries are served for METADATA_CACHE_TTL_SECONDS; after that one request rebuilds
+# them while concurrent requests wait for it, and if the rebuild fails the last good
+# body is served instead.
+RESPONSE_CACHE_TTL_SECONDS: int = settings.METADATA_CACHE_TTL_SECONDS
+_response_cache: Dict[str, Tuple[float, bytes]] = {}
+_response_cache_lock = threading.Lock()
+_response_rebuild_lock = threading.Lock()
+
+def _fresh_cache_entry(key: str) -> Optional[Tuple[float, bytes]]:
+    """The cached (cached_at, body) for `key` if it is still within the TTL, else None."""
+    entry = _response_cache.get(key)
+    if entry is not None and time.monotonic() - entry[0] < RESPONSE_CACHE_TTL_SECONDS:
+        return entry
+    return None
+
+def _cached_json_response(request: Request, build_body: Callable[[], bytes]) -> Response:
+    """Returns the cached JSON body for this path, rebuilding it via `build_body` when stale."""
+    key = request.url.path
+    entry = _fresh_cache_entry(key)
+    if entry is not None:
+        return Response(content=entry[1], media_type="application/json")
+
+    # Only one thread queries the database per refresh; the others pick up its result
+    with _response_rebuild_lock:
+        entry = _fresh_cache_entry(key)
+        if entry is not None:
+            return Response(content=entry[1], media_type="application/json")
+
+        stale = _response_cache.get(key)
+        try:
+            body = build_body()
+        except HTTPException:
+            raise
+        except Exception as e:
+            if stale is None:
+                raise
+            logger.warning(f"Serving stale cached response for {key} after refresh failed: {e}")
+            return Response(content=stale[1], media_type="application/json")
+
+        with _response_cache_lock:
+            _response_cache[key] = (time.monotonic(), body)
+    return Response(content=body, media_type="application/json")
+
+def _dump_json_array(items: Iterable[Any], item_adapter: TypeAdapter) -> bytes:
+    """Serializes items one by one into a JSON array (`[]` if there are none)."""
+    return b"[" + b",".join([item_adapter.dump_json(item) for item in items]) + b"]"
+
+
 # @router.get(
 #     "/mysql/all",
 #     response_model=List[schemas.MetadataMySQLBase],
@@ -53,9 +113,15 @@ router = APIRouter(dependencies=[metadata_read_required])
     response_model=List[schemas.CombinedStationDataPostgreSQLBase],
     summary="Get All Combined PostgreSQL Data"
 )
-async def get_all_postgresql_combined_data(db: DbPg):
-    """Fetches and combines data from multiple PostgreSQL tables for all stations."""
-    return services.get_all_combined_pg_data(db)
+def get_all_postgresql_combined_data(request: Request, db: DbPg):
+    """
+    Fetches and combines data from multiple PostgreSQL tables for all stations.
+    The serialized response is cached for `METADATA_CACHE_TTL_SECONDS`.
+    """
+    return _cached_json_response(request, lambda: _dump_json_array(
+        services.iter_combined_pg_data(db),
+        schemas.CombinedStationPgAdapter,
+    ))
 
 
 @router.get(
@@ -63,9 +129,12 @@ async def get_all_postgresql_combined_data(db: DbPg):
     response_model=schemas.CombinedStationDataPostgreSQLBase,
     summary="Get Combined PostgreSQL Data for a Single Station"
 )
-async def get_single_postgresql_combined_data(sta_code: str, db: DbPg):
+def get_single_postgresql_combined_data(sta_code: str, db: DbPg):
     """Fetches and combines data for a single station from multiple PostgreSQL tables."""
-    return services.get_combined_pg_data_by_station(db, sta_code)
+    return adapter_json_response(
+        schemas.CombinedStationPgAdapter,
+        services.get_combined_pg_data_by_station(db, sta_code),
+    )
 
 
 @router.get(
@@ -73,29 +142,82 @@ async def get_single_postgresql_combined_data(sta_code: str, db: DbPg):
     response_model=List[schemas.StationSensorBase],
     summary="Retrieve Station Sensor Information"
 )
-async def read_station_sensors(sta_code: str, db: DbPg):
+def read_station_sensors(sta_code: str, db: DbPg):
     """Retrieves a list of sensor information for a specific station by its code."""
-    return services.get_sensors_by_station(db, sta_code)
+    return adapter_json_response(
+        schemas.StationSensorListAdapter,
+        services.get_sensors_by_station(db, sta_code),
+    )
 
 
 @router.get(
     "/latency/{sta_code}/{channel}",
-    response_model=Dict[datetime_cls, int],
+    response_model=Union[Dict[datetime_cls, int], Dict[int, int]],
     summary="Retrieve Latency Data for a Specific Station and Channel"
 )
-async def read_station_sensor_latency(
+def read_station_sensor_latency(
     sta_code: str,
     channel: str,
     db: DbPg,
     start_datetime: Optional[datetime_cls] = Query(None, description="Start datetime (ISO format). Defaults to 7 days ago."),
     end_datetime: Optional[datetime_cls] = Query(None, description="End datetime (ISO format). Defaults to now."),
+    epoch_ms: bool = Query(False, description="Key the series by UTC epoch milliseconds instead of ISO datetimes."),
 ):
-    """Fetches latency records for a station and channel within a specified time range."""
-    return services.get_latency_by_station_channel(
+    """
+    Fetches latency records for a station and channel within a specified time range.
+    With `epoch_ms=true` the keys are integer epoch milliseconds, which are shorter on the wire.
+    """
+    latencies = services.get_latency_by_station_channel(
         db=db,
         sta=sta_code,
         channel=channel,
         start_dt=start_datetime,
-        end_dt=end_datetime
+        end_dt=end_datetime,
+        epoch_ms=epoch_ms
+    )
+    adapter = schemas.LatencyEpochMsMapAdapter if epoch_ms else schemas.LatencyMapAdapter
+    return adapter_json_response(adapter, latencies)
+
+
+@router.get(
+    "/latency/{sta_code}",
+    response_model=Union[Dict[str, Dict[datetime_cls, int]], Dict[str, Dict[int, int]]],
+    summary="Retrieve Latency Data for Several Channels of a Station"
+)
+def read_station_latency_by_channels(
+    sta_code: str,
+    db: DbPg,
+    channels: List[str] = Query(..., description="Channel codes to fetch, e.g. `?channels=BHZ&channels=BHN`."),
+    start_datetime: Optional[datetime_cls] = Query(None, description="Start datetime (ISO format). Defaults to 7 days ago."),
+    end_datetime: Optional[datetime_cls] = Query(None, description="End datetime (ISO format). Defaults to now."),
+    epoch_ms: bool = Query(False, description="Key each series by UTC epoch milliseconds instead of ISO datetimes."),
+):
+    """
+    Fetches latency records for several channels of a station in one query,
+    returned as `{channel: {datetime: latency}}`.
+    """
+    latencies = services.get_latency_by_station_channels(
+        db=db,
+        sta=sta_code,
+        channels=list(dict.fromkeys(channels)),
+        start_dt=start_datetime,
+        end_dt=end_datetime,
+        epoch_ms=epoch_ms
     )
+    adapter = schemas.LatencyEpochMsByChannelAdapter if epoch_ms else schemas.LatencyByChannelAdapter
+    return adapter_json_response(adapter, latencies)
 
+
+@router.post(
+    "/cache/flush",
+    summary="Flush Cached Metadata Responses",
+    dependencies=[admin_required]
+)
+def flush_metadata_cache():
+    """Drops all cached metadata responses and station lookups so the next requests re-query the database. Admin only."""
+    with _response_cache_lock:
+        flushed = len(_response_cache)
+        _response_cache.clear()
+    flushed += services.clear_station_cache()
+    logger.info(f"Metadata response cache flushed ({flushed} entries).")
+    return {"message": "Metadata cache flushed.", "flushed_entries": flushed}
@@ -1,11 +1,26 @@
-from pydantic import BaseModel, Field, condecimal, computed_field
-from typing import Optional, List, Dict, Any, Annotated
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, computed_field, field_validator
+from typing import Optional, List, Dict, Any, ClassVar, Tuple
 from decimal import Decimal
+from functools import cached_property
 from datetime import datetime as datetime_cls
 from datetime import timedelta
+from enum import StrEnum
 
 ## Response Schemas ##
 
+class FieldNamesMixin:
+    """
+    Records each response model's field names in `__all_field_names__` once pydantic
+    builds the class, so services can project exactly the columns the schema exposes.
+    """
+    # Field names, frozen once per class when pydantic finishes building it.
+    __all_field_names__: ClassVar[Tuple[str, ...]] = ()
+
+    @classmethod
+    def __pydantic_init_subclass__(cls, **kwargs: Any) -> None:
+        super().__pydantic_init_subclass__(**kwargs)
+        cls.__all_field_names__ = tuple(cls.model_fields)
+
 class GeometryBase(BaseModel):
     """
     **Geometry Model for Geographic Coordinates**
@@ -30,8 +45,17 @@ class GeometryBase(BaseModel):
     type: str = Field(..., description="Type of geometry, e.g., 'Point'")
     coordinates: List[float] = Field(..., description="List of coordinates [longitude, latitude, (optional) altitude]")
 
+    model_config = ConfigDict(frozen=True, extra='ignore')
+
+def point_geometry(longitude: Any, latitude: Any) -> GeometryBase:
+    """
+    Builds a station Point geometry `[longitude, latitude, 1.0]` without validation;
+    the coordinates come from typed metadata columns.
+    """
+    return GeometryBase.model_construct(type="Point", coordinates=[float(longitude), float(latitude), 1.0])
+
 # Pydantic Model for MetadataMySQL (tb_slmon)
-class MetadataMySQLBase(BaseModel):
+class MetadataMySQLBase(FieldNamesMixin, BaseModel):
     """
     **Metadata from MySQL Database (tb_slmon)**
 
@@ -43,8 +67,8 @@ class MetadataMySQLBase(BaseModel):
     - **no_urut** (`int`): Sequential number.
     - **kode_sensor** (`Optional[str]`): Unique code for the sensor/station.
     - **lokasi_sensor** (`Optional[str]`): Textual description of the sensor's location.
-    - **lat_sensor** (`Optional[str]`): Latitude of the sensor as a string.
-    - **lon_sensor** (`Optional[str]`): Longitude of the sensor as a string.
+    - **lat_sensor** (`Optional[float]`): Latitude of the sensor, parsed from the stored string.
+    - **lon_sensor** (`Optional[float]`): Longitude of the sensor, parsed from the stored string.
     - **sistem_sensor** (`Optional[str]`): Type of sensor system.
     - **pj_sensor** (`Optional[str]`): Responsible person or team for the sensor.
     - **balai** (`Optional[str]`): Regional office or unit responsible.
@@ -72,38 +96,67 @@ class MetadataMySQLBase(BaseModel):
     - `from_attributes = True`: Enables mapping from ORM models (SQLAlchemy) to Pydantic models.
     """
     no_urut: int
-    kode_sensor: Optional[str] = Field(None, max_length=30, description="Unique code for the sensor/station")
-    lokasi_sensor: Optional[str] = Field(None, max_length=300, description="Textual description of the sensor's location")
-    lat_sensor: Optional[str] = Field(None, max_length=30, description="Latitude of the sensor as a string")
-    lon_sensor: Optional[str] = Field(None, max_length=30, description="Longitude of the sensor as a string")
-    sistem_sensor: Optional[str] = Field(None, max_length=60, description="Type of sensor system")
-    pj_sensor: Optional[str] = Field(None, max_length=30, description="Responsible person or team for the sensor")
-    balai: Optional[str] = Field(None, max_length=30, description="Regional office or unit responsible")
-    ket_sensor: Optional[str] = Field(None, max_length=60, description="Additional remarks or notes about the sensor")
-    status_sensor: Optional[str] = Field(None, max_length=30, description="Current operational status of the sensor")
-    last_data: Optional[str] = Field(None, max_length=60, description="Timestamp or indicator of the last data received")
-    pic: Optional[str] = Field(None, max_length=30, description="Person in charge")
-    sta_mag: Optional[str] = Field(None, max_length=15, description="Station magnitude information")
-    geo: Optional[str] = Field(None, max_length=300, description="Path or link to geographical survey data")
-    vs30: Optional[str] = Field(None, max_length=300, description="Path or link to Vs30 (shear wave velocity) data")
-    photo: Optional[str] = Field(None, max_length=300, description="Path or link to station photos")
-    hvsr: Optional[str] = Field(None, max_length=300, description="Path or link to Horizontal-to-Vertical Spectral Ratio (HVSR) data")
-    psd: Optional[str] = Field(None, max_length=300, description="Path or link to Power Spectral Density (PSD) data")
-    nilai: Optional[str] = Field(None, max_length=10, description="A value associated with the station")
-    keterangan2: Optional[str] = Field(None, max_length=100, description="Further description or additional notes")
+    kode_sensor: Optional[str] = Field(None, description="Unique code for the sensor/station")
+    lokasi_sensor: Optional[str] = Field(None, description="Textual description of the sensor's location")
+    lat_sensor: Optional[float] = Field(None, description="Latitude of the sensor")
+    lon_sensor: Optional[float] = Field(None, description="Longitude of the sensor")
+    sistem_sensor: Optional[str] = Field(None, description="Type of sensor system")
+    pj_sensor: Optional[str] = Field(None, description="Responsible person or team for the sensor")
+    balai: Optional[str] = Field(None, description="Regional office or unit responsible")
+    ket_sensor: Optional[str] = Field(None, description="Additional remarks or notes about the sensor")
+    status_sensor: Optional[str] = Field(None, description="Current operational status of the sensor")
+    last_data: Optional[str] = Field(None, description="Timestamp or indicator of the last data received")
+    pic: Optional[str] = Field(None, description="Person in charge")
+    sta_mag: Optional[str] = Field(None, description="Station magnitude information")
+    geo: Optional[str] = Field(None, description="Path or link to geographical survey data")
+    vs30: Optional[str] = Field(None, description="Path or link to Vs30 (shear wave velocity) data")
+    photo: Optional[str] = Field(None, description="Path or link to station photos")
+    hvsr: Optional[str] = Field(None, description="Path or link to Horizontal-to-Vertical Spectral Ratio (HVSR) data")
+    psd: Optional[str] = Field(None, description="Path or link to Power Spectral Density (PSD) data")
+    nilai: Optional[str] = Field(None, description="A value associated with the station")
+    keterangan2: Optional[str] = Field(None, description="Further description or additional notes")
     gval: Optional[int] = Field(None, description="Numeric value derived from 'geo' data")
     vval: Optional[int] = Field(None, description="Numeric value derived from 'vs30' data")
     pval: Optional[int] = Field(None, description="Numeric value derived from 'photo' data")
     hval: Optional[int] = Field(None, description="Numeric value derived from 'hvsr' data")
     psdval: Optional[int] = Field(None, description="Numeric value derived from 'psd' data")
-    sensormerk: Optional[str] = Field(None, max_length=50, description="Brand or manufacturer of the sensor")
-    digitizermerk: Optional[str] = Field(None, max_length=50, description="Brand or manufacturer of the digitizer")
+    sensormerk: Optional[str] = Field(None, description="Brand or manufacturer of the sensor")
+    digitizermerk: Optional[str] = Field(None, description="Brand or manufacturer of the digitizer")
+
+    @field_validator("lat_sensor", "lon_sensor", mode="before")
+    @classmethod
+    def _blank_coordinate_to_none(cls, value: Any) -> Any:
+        """tb_slmon stores coordinates as text; empty and '-' placeholders mean unknown."""
+        if isinstance(value, str):
+            value = value.strip()
+            if value in ("", "-"):
+                return None
+        return value
 
     class Config:
         from_attributes = True
 
+# Shared columns of the PostgreSQL `stations` table. Pydantic collects fields from the far
+# end of the MRO first, so schemas list _StationCoreFields before _StationIdentityFields
+# to keep `code, network, latitude, longitude` ahead of the descriptive columns.
+class _StationIdentityFields(BaseModel):
+    code: str = Field(..., description="Unique identifier code for the station")
+    network: str = Field(..., description="The seismic network to which the station belongs")
+    latitude: Decimal = Field(..., description="Geographic latitude")
+    longitude: Decimal = Field(..., description="Geographic longitude")
+
+class _StationCoreFields(BaseModel):
+    province: Optional[str] = Field(None, description="The province where the station is located")
+    location: Optional[str] = Field(None, description="A more detailed textual description of the station's location")
+    year: Optional[int] = Field(None, description="The year the station was established or installed")
+    upt: Optional[str] = Field(None, description="The Unit Pelaksana Teknis (Technical Implementation Unit) responsible for the station")
+    balai: Optional[int] = Field(None, description="An identifier for the Balai (regional office) responsible for the station")
+    digitizer_type: Optional[str] = Field(None, description="Describes the type or model of digitizer used at the station")
+    communication_type: Optional[str] = Field(None, description="Describes the primary method of data communication (e.g., VSAT, fiber)")
+    network_group: Optional[str] = Field(None, description="A broader grouping for the network")
+
 # Pydantic Model for MetadataPostgreSQL (stations)
-class MetadataPostgreSQLBase(BaseModel):
+class MetadataPostgreSQLBase(FieldNamesMixin, _StationCoreFields, _StationIdentityFields):
     """
     **Metadata from PostgreSQL Database (stations table)**
 
@@ -128,24 +181,12 @@ class MetadataPostgreSQLBase(BaseModel):
     Config:
     - `from_attributes = True`: Enables mapping from ORM models (SQLAlchemy) to Pydantic models.
     """
-    code: str = Field(..., max_length=10, description="Unique identifier code for the station")
-    network: str = Field(..., max_length=10, description="The seismic network to which the station belongs")
-    latitude: Annotated[Decimal, condecimal(max_digits=9, decimal_places=7)] = Field(..., description="Geographic latitude")
-    longitude: Annotated[Decimal, condecimal(max_digits=8, decimal_places=5)] = Field(..., description="Geographic longitude")
-    province: Optional[str] = Field(None, max_length=50, description="The province where the station is located")
-    location: Optional[str] = Field(None, max_length=100, description="A more detailed textual description of the station's location")
-    year: Optional[int] = Field(None, description="The year the station was established or installed")
-    upt: Optional[str] = Field(None, max_length=100, description="The Unit Pelaksana Teknis (Technical Implementation Unit) responsible for the station")
-    balai: Optional[int] = Field(None, description="An identifier for the Balai (regional office) responsible for the station")
-    digitizer_type: Optional[str] = Field(None, max_length=100, description="Describes the type or model of digitizer used at the station")
-    communication_type: Optional[str] = Field(None, max_length=100, description="Describes the primary method of data communication (e.g., VSAT, fiber)")
-    network_group: Optional[str] = Field(None, max_length=100, description="A broader grouping for the network")
 
     class Config:
         from_attributes = True
 
 # Pydatic Model for Combined Station Data PostgreSQL
-class CombinedStationDataPostgreSQLBase(BaseModel):
+class CombinedStationDataPostgreSQLBase(_StationCoreFields, _StationIdentityFields):
     """
     **Combined Station Data from PostgreSQL Tables**
 
@@ -175,19 +216,7 @@ class CombinedStationDataPostgreSQLBase(BaseModel):
     Config:
     - `from_attributes = True`: Enables mapping from ORM models (SQLAlchemy) to Pydantic models.
     """
-    # Fields from MetadataPostgreSQL (stations)
-    code: str = Field(..., description="Station Unique identifier code (from stations table)")
-    network: str = Field(..., description="Network identifier (from stations table)")
-    latitude: Annotated[Decimal, condecimal(max_digits=9, decimal_places=7)] = Field(..., description="Geographic latitude (from stations table)")
-    longitude: Annotated[Decimal, condecimal(max_digits=8, decimal_places=5)] = Field(..., description="Geographic longitude (from stations table)")
-    province: Optional[str] = Field(None, max_length=50, description="Province name (from stations table)")
-    location: Optional[str] = Field(None, max_length=100, description="Location description (from stations table)")
-    year: Optional[int] = Field(None, description="Year of station installation (from stations table)")
-    upt: Optional[str] = Field(None, max_length=100, description="UPT (Unit Pelaksana Teknis) identifier (from stations table)")
-    balai: Optional[int] = Field(None, description="Balai identifier (from stations table)")
-    digitizer_type: Optional[str] = Field(None, max_length=100, description="Type of digitizer used (from stations table)")
-    communication_type: Optional[str] = Field(None, max_length=100, description="Type of communication used (from stations table)")
-    network_group: Optional[str] = Field(None, max_length=100, description="Network group identifier (from stations table)")
+    # Fields from MetadataPostgreSQL (stations) are inherited from the shared station mixins
 
     # Fields from StationVisitPostgreSQL (stations_visit)
     visit_year: Optional[str] = Field("", description="Year of station visit (from stations_visit table). Defaults to empty string if null.") # Default to empty string
@@ -199,7 +228,7 @@ class CombinedStationDataPostgreSQLBase(BaseModel):
     class Config:
         from_attributes = True
 
-class CombinedStationDataBase(BaseModel):
+class CombinedStationDataBase(_StationCoreFields):
     """
     **Combined Station Data from MySQL and PostgreSQL Databases**
 
@@ -237,16 +266,9 @@ class CombinedStationDataBase(BaseModel):
     station_code: str = Field(..., description="Unique identifier for the station, from MySQL's kode_sensor")
     # Fields from PostgreSQL (all Optional, as a match might not exist)
     network: Optional[str] = Field(None, description="Network identifier (from PostgreSQL)")
-    latitude: Optional[Annotated[Decimal, condecimal(max_digits=9, decimal_places=7)]] = Field(None, description="Geographic latitude (from PostgreSQL)")
-    longitude: Optional[Annotated[Decimal, condecimal(max_digits=8, decimal_places=5)]] = Field(None, description="Geographic longitude (from PostgreSQL)")
-    province: Optional[str] = Field(None, max_length=50, description="Province name (from PostgreSQL)")
-    location: Optional[str] = Field(None, max_length=100, description="Location description (from PostgreSQL)")
-    year: Optional[int] = Field(None, description="Year of station installation (from PostgreSQL)")
-    upt: Optional[str] = Field(None, max_length=100, description="UPT (Unit Pelaksana Teknis) identifier (from PostgreSQL)")
-    balai: Optional[int] = Field(None, description="Balai identifier (from PostgreSQL)")
-    digitizer_type: Optional[str] = Field(None, max_length=100, description="Type of digitizer used (from PostgreSQL)")
-    communication_type: Optional[str] = Field(None, max_length=100, description="Type of communication used (from PostgreSQL)")
-    network_group: Optional[str] = Field(None, max_length=100, description="Network group identifier (from PostgreSQL)")
+    latitude: Optional[Decimal] = Field(None, description="Geographic latitude (from PostgreSQL)")
+    longitude: Optional[Decimal] = Field(None, description="Geographic longitude (from PostgreSQL)")
+    # province .. network_group (from PostgreSQL) are inherited from _StationCoreFields
 
     # FIELDS FROM stations_visit (PostgreSQL)
     visit_year: Optional[str] = Field(None, description="Year of station visit (from PostgreSQL stations_visit)")
@@ -256,11 +278,11 @@ class CombinedStationDataBase(BaseModel):
     dominant_data_quality: Optional[str] = Field(None, description="Dominant data quality (from PostgreSQL stations_dominant_data_quality)")
 
     # Fields from MySQL
-    geo: Optional[str] = Field(None, max_length=300, description="Geographical information (from MySQL)")
-    vs30: Optional[str] = Field(None, max_length=300, description="Vs30 data (from MySQL)")
-    photo: Optional[str] = Field(None, max_length=300, description="Photo URL/path (from MySQL)")
-    hvsr: Optional[str] = Field(None, max_length=300, description="HVSR data (from MySQL)")
-    psd: Optional[str] = Field(None, max_length=300, description="PSD data (from MySQL)")
+    geo: Optional[str] = Field(None, description="Geographical information (from MySQL)")
+    vs30: Optional[str] = Field(None, description="Vs30 data (from MySQL)")
+    photo: Optional[str] = Field(None, description="Photo URL/path (from MySQL)")
+    hvsr: Optional[str] = Field(None, description="HVSR data (from MySQL)")
+    psd: Optional[str] = Field(None, description="PSD data (from MySQL)")
 
     class Config:
         from_attributes = True
@@ -280,14 +302,20 @@ class StationSensorBase(BaseModel):
 
     Config:
     - `from_attributes = True`: Enables mapping from ORM models (SQLAlchemy) to Pydantic models.
+    - `frozen = True`: Instances are immutable once built.
     """
     code: Optional[str] = Field(None, description="Unique code for the station sensor")
     location: Optional[str] = Field(None, description="Geographical location of the sensor")
     channel: Optional[str] = Field(None, description="Communication channel of the sensor")
     sensor: Optional[str] = Field(None, description="Type or name of the sensor")
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True, frozen=True, extra='ignore', validate_assignment=False, revalidate_instances='never')
+
+class ColorCode(StrEnum):
+    """Latency status colors stored in `stations_sensor_latency.color_code`."""
+    GREEN = "green"
+    YELLOW = "yellow"
+    RED = "red"
 
 # Pydantic model for StationSensorLatency data (input/output)
 class StationSensorLatencyBase(BaseModel):
@@ -304,42 +332,22 @@ class StationSensorLatencyBase(BaseModel):
     - **channel** (`Optional[str]`): The specific channel (e.g., HHZ, HHE) for which latency is recorded.
     - **last_time_channel** (`Optional[datetime_cls]`): The last time data was successfully received on this channel.
     - **latency** (`Optional[int]`): The latency value in milliseconds.
-    - **color_code** (`Optional[str]`): A color code (e.g., "green", "yellow", "red") indicating the severity or status of the latency.
+    - **color_code** (`Optional[ColorCode]`): A color code (e.g., "green", "yellow", "red") indicating the severity or status of the latency.
 
     Config:
     - `from_attributes = True`: Enables mapping from ORM models (SQLAlchemy) to Pydantic models.
     """
-    net: Optional[str] = Field(None, max_length=50, description="Network code")
-    sta: Optional[str] = Field(None, max_length=50, description="Station code")
+    net: Optional[str] = Field(None, description="Network code")
+    sta: Optional[str] = Field(None, description="Station code")
     datetime: Optional[datetime_cls] = Field(None, description="Timestamp of the latency record")
-    channel: Optional[str] = Field(None, max_length=50, description="Channel name")
+    channel: Optional[str] = Field(None, description="Channel name")
     last_time_channel: Optional[datetime_cls] = Field(None, description="Last time data was received on the channel")
     latency: Optional[int] = Field(None, description="Latency value in milliseconds")
-    color_code: Optional[str] = Field(None, max_length=20, description="Color code indicating latency status")
+    color_code: Optional[ColorCode] = Field(None, description="Color code indicating latency status")
 
     class Config:
         from_attributes = True
 
-# New Pydantic model for the desired output format: {datetime: latency}
-class StationSensorLatencyOutputBase(BaseModel):
-    """
-    **Station Sensor Latency Output Format**
-
-    This schema is designed specifically for an API endpoint that returns
-    latency data as a mapping of timestamps to latency values. It simplifies
-    the `StationSensorLatencyBase` to only include the `datetime` and `latency` fields.
-
-    Attributes:
-    - **datetime** (`datetime_cls`): The timestamp of the latency record.
-    - **latency** (`int`): The latency value in milliseconds.
-
-    This model is typically used when the API response directly provides a dictionary
-    where the key is the datetime and the value is the latency, like so:
-    `{ "2023-01-01T10:00:00": 50, "2023-01-01T10:01:00": 60 }`.
-    """
-    datetime: datetime_cls = Field(..., description="Timestamp of the latency record")
-    latency: int = Field(..., description="Latency value in milliseconds")
-
 class StationSiteQualityBase(BaseModel):
     """
     **Station Site Quality and Computed Geometry**
@@ -392,22 +400,39 @@ class StationSiteQualityBase(BaseModel):
     site_quality: Optional[str] = Field("Unknown", description="General qualitative assessment of the site quality.")
 
     @computed_field
-    @property
+    @cached_property
     def geometry(self) -> Optional[GeometryBase]:
         """
         Computes the geographic geometry (Point) of the station.
+        The result is cached on the instance and built without re-validation,
+        since the coordinates come from already-typed station metadata.
 
         Returns:
             Optional[GeometryBase]: A GeometryBase object if latitude and longitude
                                     are available in station_metadata, otherwise None.
         """
-        if hasattr(self, 'station_metadata') and self.station_metadata:
-            if self.station_metadata.latitude is not None and self.station_metadata.longitude is not None:
-                return GeometryBase(
-                    type="Point",
-                    coordinates=[float(self.station_metadata.longitude), float(self.station_metadata.latitude), 1.0] # Assuming 1.0 for altitude if not explicitly provided
-                )
-        return None
+        metadata = self.station_metadata
+        if metadata is None:
+            return None
+        latitude, longitude = metadata.latitude, metadata.longitude
+        if latitude is None or longitude is None:
+            return None
+        return point_geometry(longitude, latitude)
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+## Type Adapters ##
+# Built once at import; routes use them to serialize a whole response body in a single
+# pass instead of going through FastAPI's response_model encoding per request.
+CombinedStationPgAdapter = TypeAdapter(CombinedStationDataPostgreSQLBase)
+StationSensorListAdapter = TypeAdapter(List[StationSensorBase])
+# Latency time series as a plain {datetime: latency_ms} mapping,
+# e.g. `{ "2023-01-01T10:00:00": 50, "2023-01-01T10:01:00": 60 }`.
+LatencyMapAdapter = TypeAdapter(Dict[datetime_cls, int])
+# Same series keyed by UTC epoch milliseconds, e.g. `{ "1672567200000": 50 }`.
+LatencyEpochMsMapAdapter = TypeAdapter(Dict[int, int])
+# Several channels of one station, keyed by channel code: `{ "BHZ": {...}, "BHN": {...} }`.
+LatencyByChannelAdapter = TypeAdapter(Dict[str, Dict[datetime_cls, int]])
+LatencyEpochMsByChannelAdapter = TypeAdapter(Dict[str, Dict[int, int]])
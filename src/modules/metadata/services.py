@@ -1,114 +1,183 @@
 import logging
-from datetime import datetime as datetime_cls, timedelta
-from typing import List, Dict, Optional
+import threading
+from datetime import datetime as datetime_cls, timedelta, timezone
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, TypeVar, Union
 
+from cachetools import TTLCache
 from fastapi import HTTPException, status
-from sqlalchemy import select
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import Row, bindparam, case, func, select
+from sqlalchemy.orm import Session
 
+from src.core.config import settings
 from . import models, schemas
 
 logger = logging.getLogger(__name__)
 
+_T = TypeVar("_T")
 
-def get_all_mysql_metadata(db: Session) -> List[models.MetadataMySQL]:
+
+def _schema_columns(model: type, schema: type) -> Tuple:
+    """The model's columns for each field of `schema`, for projected (non-ORM) selects."""
+    return tuple(getattr(model, name) for name in schema.__all_field_names__)
+
+_MYSQL_METADATA_COLUMNS = _schema_columns(models.MetadataMySQL, schemas.MetadataMySQLBase)
+_PG_METADATA_COLUMNS = _schema_columns(models.MetadataPostgreSQL, schemas.MetadataPostgreSQLBase)
+
+# Hot-path statements are built once at import with bind parameters for the per-request
+# values. SQLAlchemy memoizes the cache key on a statement object, so repeated executions
+# go straight to the compiled-SQL cache instead of rebuilding and re-keying a Select.
+_ALL_MYSQL_METADATA_STMT = select(*_MYSQL_METADATA_COLUMNS)
+_ALL_PG_METADATA_STMT = select(*_PG_METADATA_COLUMNS)
+_MYSQL_METADATA_BY_CODE_STMT = select(models.MetadataMySQL).where(
+    models.MetadataMySQL.kode_sensor == bindparam("sta_code")
+)
+_PG_METADATA_BY_CODE_STMT = select(models.MetadataPostgreSQL).where(
+    models.MetadataPostgreSQL.code == bindparam("sta_code")
+)
+
+
+def get_all_mysql_metadata(db: Session) -> List[schemas.MetadataMySQLBase]:
     """Fetches all station metadata from the MySQL database."""
-    metadata = db.execute(select(models.MetadataMySQL)).scalars().all()
-    if not metadata:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No metadata found in MySQL.")
-    return metadata
+    rows = db.execute(_ALL_MYSQL_METADATA_STMT).all()
+    # Validated (not constructed) so the text lat/lon columns are parsed into floats
+    return [schemas.MetadataMySQLBase.model_validate(dict(row._mapping)) for row in rows]
 
 def get_mysql_metadata_by_station(db: Session, sta_code: str) -> models.MetadataMySQL:
     """Fetches metadata for a single station from MySQL."""
-    metadata = db.execute(
-        select(models.MetadataMySQL).where(models.MetadataMySQL.kode_sensor == sta_code)
-    ).scalar_one_or_none()
+    metadata = db.execute(_MYSQL_METADATA_BY_CODE_STMT, {"sta_code": sta_code}).scalar_one_or_none()
     if not metadata:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Metadata for station '{sta_code}' not found in MySQL.")
     return metadata
 
-def get_all_pg_metadata(db: Session) -> List[models.MetadataPostgreSQL]:
+def get_all_pg_metadata(db: Session) -> List[schemas.MetadataPostgreSQLBase]:
     """Fetches all station metadata from the PostgreSQL database."""
-    metadata = db.execute(select(models.MetadataPostgreSQL)).scalars().all()
-    if not metadata:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No metadata found in PostgreSQL.")
-    return metadata
+    rows = db.execute(_ALL_PG_METADATA_STMT).all()
+    return [schemas.MetadataPostgreSQLBase.model_construct(**row._mapping) for row in rows]
 
 def get_pg_metadata_by_station(db: Session, sta_code: str) -> models.MetadataPostgreSQL:
     """Fetches metadata for a single station from PostgreSQL."""
-    metadata = db.execute(
-        select(models.MetadataPostgreSQL).where(models.MetadataPostgreSQL.code == sta_code)
-    ).scalar_one_or_none()
+    metadata = db.execute(_PG_METADATA_BY_CODE_STMT, {"sta_code": sta_code}).scalar_one_or_none()
     if not metadata:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Metadata for station '{sta_code}' not found in PostgreSQL.")
     return metadata
 
 
-def _build_combined_pg_object(
-    main_rec: models.MetadataPostgreSQL,
-    visit_lookup: Dict,
-    quality_lookup: Dict
-) -> schemas.CombinedStationDataPostgreSQLBase:
-    """Helper function to construct a single combined PostgreSQL data object."""
-    join_key = main_rec.code
-    visit_rec = visit_lookup.get(join_key)
-    quality_rec = quality_lookup.get(join_key)
+def _combined_pg_stmt():
+    """
+    The response columns of stations LEFT JOINed to their (one-per-code) visit and
+    dominant-quality rows. Defaults for a missing visit/quality row are applied in SQL,
+    so each result row maps directly onto CombinedStationDataPostgreSQLBase.
+    """
+    visit = models.StationVisitPostgreSQL
+    quality = models.StationDominantDataQualityPostgreSQL
+    return (
+        select(
+            *_PG_METADATA_COLUMNS,
+            case((visit.code.is_(None), ""), else_=visit.visit_year).label("visit_year"),
+            case((visit.code.is_(None), 0), else_=visit.visit_count).label("visit_count"),
+            case((quality.code.is_(None), "Unknown"), else_=quality.dominant_data_quality).label("dominant_data_quality"),
+        )
+        .select_from(models.MetadataPostgreSQL)
+        .outerjoin(visit, visit.code == models.MetadataPostgreSQL.code)
+        .outerjoin(quality, quality.code == models.MetadataPostgreSQL.code)
+    )
 
-    data_dict = {
-        **main_rec.__dict__,
-        "visit_year": visit_rec.visit_year if visit_rec else "",
-        "visit_count": visit_rec.visit_count if visit_rec else 0,
-        "dominant_data_quality": quality_rec.dominant_data_quality if quality_rec else "Unknown"
-    }
-    return schemas.CombinedStationDataPostgreSQLBase(**data_dict)
+
+_COMBINED_PG_STMT = _combined_pg_stmt()
+_COMBINED_PG_BY_CODE_STMT = _COMBINED_PG_STMT.where(models.MetadataPostgreSQL.code == bindparam("sta_code"))
+
+def _build_combined_pg_object(row: Row) -> schemas.CombinedStationDataPostgreSQLBase:
+    """Helper function to construct a single combined PostgreSQL data object from a projected row."""
+    return schemas.CombinedStationDataPostgreSQLBase.model_construct(**row._mapping)
+
+
+# Rows fetched per round trip when streaming the joined stations result through a server-side cursor
+STREAM_BATCH_SIZE = 500
+_COMBINED_PG_STREAM_STMT = _COMBINED_PG_STMT.execution_options(yield_per=STREAM_BATCH_SIZE)
+
+def iter_combined_pg_data(db: Session) -> Iterator[schemas.CombinedStationDataPostgreSQLBase]:
+    """
+    Yields combined station records one at a time. The join is done by PostgreSQL in a
+    single query that selects only the response columns (no ORM instances), and the
+    result is streamed with a server-side cursor, so the full result is never held in memory.
+    """
+    rows = db.execute(_COMBINED_PG_STREAM_STMT)
+    for row in rows:
+        yield _build_combined_pg_object(row)
 
 
 def get_all_combined_pg_data(db: Session) -> List[schemas.CombinedStationDataPostgreSQLBase]:
     """Fetches and combines station data from multiple PostgreSQL tables."""
-    main_records = db.execute(select(models.MetadataPostgreSQL)).scalars().all()
-    if not main_records:
-        raise HTTPException(status_code=404, detail="No primary station records found in PostgreSQL.")
-        
-    visit_records = db.execute(select(models.StationVisitPostgreSQL)).scalars().all()
-    quality_records = db.execute(select(models.StationDominantDataQualityPostgreSQL)).scalars().all()
+    return list(iter_combined_pg_data(db))
 
-    visit_lookup = {rec.code: rec for rec in visit_records}
-    quality_lookup = {rec.code: rec for rec in quality_records}
 
-    return [_build_combined_pg_object(rec, visit_lookup, quality_lookup) for rec in main_records]
+# --- Per-Station Cache ---
+# Station metadata and sensor lists change rarely, so single-station lookups are cached
+# as built response models keyed by (lookup, sta_code). 404s and empty results are not
+# cached, so a station that gains its first rows shows up on the next request.
+# TTLCache is not thread-safe and sync endpoints run in a threadpool, hence the lock.
+STATION_CACHE_TTL_SECONDS: int = settings.STATION_CACHE_TTL_SECONDS
+_station_cache: TTLCache = TTLCache(maxsize=4096, ttl=STATION_CACHE_TTL_SECONDS)
+_station_cache_lock = threading.Lock()
+_MISSING = object()
+
+def _cached_by_station(lookup: str, sta_code: str, load: Callable[[], _T]) -> _T:
+    """Returns the cached result of `load` for this station, calling it on a miss."""
+    key = (lookup, sta_code)
+    with _station_cache_lock:
+        value = _station_cache.get(key, _MISSING)
+    if value is _MISSING:
+        value = load()
+        if value:
+            with _station_cache_lock:
+                _station_cache[key] = value
+    return value
+
+def clear_station_cache() -> int:
+    """Drops all cached per-station lookups; returns how many entries were removed."""
+    with _station_cache_lock:
+        cleared = len(_station_cache)
+        _station_cache.clear()
+    return cleared
 
 
 def get_combined_pg_data_by_station(db: Session, sta_code: str) -> schemas.CombinedStationDataPostgreSQLBase:
-    """Fetches and combines data for a single station from PostgreSQL."""
-    main_rec = get_pg_metadata_by_station(db, sta_code)
-    
-    visit_rec = db.execute(select(models.StationVisitPostgreSQL).where(models.StationVisitPostgreSQL.code == sta_code)).scalar_one_or_none()
-    quality_rec = db.execute(select(models.StationDominantDataQualityPostgreSQL).where(models.StationDominantDataQualityPostgreSQL.code == sta_code)).scalar_one_or_none()
-    
-    visit_lookup = {sta_code: visit_rec} if visit_rec else {}
-    quality_lookup = {sta_code: quality_rec} if quality_rec else {}
-
-    return _build_combined_pg_object(main_rec, visit_lookup, quality_lookup)
-
-
-def get_sensors_by_station(db: Session, sta_code: str) -> List[models.StationSensorPostgreSQL]:
-    """Retrieves sensor information for a specific station."""
-    sensors = db.execute(
-        select(models.StationSensorPostgreSQL).where(models.StationSensorPostgreSQL.code == sta_code)
-    ).scalars().all()
-    if not sensors:
-        raise HTTPException(status_code=404, detail=f"Station sensor data not found for code '{sta_code}'")
-    return sensors
+    """Fetches and combines data for a single station from PostgreSQL (cached per station)."""
+    def load() -> schemas.CombinedStationDataPostgreSQLBase:
+        row = db.execute(_COMBINED_PG_BY_CODE_STMT, {"sta_code": sta_code}).one_or_none()
+        if row is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Metadata for station '{sta_code}' not found in PostgreSQL.")
+        return _build_combined_pg_object(row)
 
-def get_latency_by_station_channel(
-    db: Session,
-    sta: str,
-    channel: str,
+    return _cached_by_station("combined", sta_code, load)
+
+
+_SENSORS_BY_CODE_STMT = select(models.StationSensorPostgreSQL).where(
+    models.StationSensorPostgreSQL.code == bindparam("sta_code")
+)
+
+def get_sensors_by_station(db: Session, sta_code: str) -> List[schemas.StationSensorBase]:
+    """Retrieves sensor information for a specific station (cached per station)."""
+    def load() -> List[schemas.StationSensorBase]:
+        sensors = db.execute(_SENSORS_BY_CODE_STMT, {"sta_code": sta_code}).scalars().all()
+        return schemas.StationSensorListAdapter.validate_python(sensors, from_attributes=True)
+
+    return _cached_by_station("sensors", sta_code, load)
+
+_EPOCH = datetime_cls(1970, 1, 1)
+_ONE_MILLISECOND = timedelta(milliseconds=1)
+
+def to_epoch_ms(dt: datetime_cls) -> int:
+    """Converts a datetime to integer epoch milliseconds; naive values (as stored) are taken as UTC."""
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return (dt - _EPOCH) // _ONE_MILLISECOND
+
+def _latency_window(
     start_dt: Optional[datetime_cls],
     end_dt: Optional[datetime_cls]
-) -> Dict[datetime_cls, int]:
-    """Retrieves latency data with robust date filtering."""
-    # Define the time range
+) -> Tuple[datetime_cls, datetime_cls]:
+    """Fills in a missing bound of the latency time range; the default window is the last 7 days."""
     if start_dt is None and end_dt is None:
         end_dt = datetime_cls.now()
         start_dt = end_dt - timedelta(days=7)
@@ -116,18 +185,73 @@ def get_latency_by_station_channel(
         end_dt = datetime_cls.now()
     elif not start_dt and end_dt:
         start_dt = end_dt - timedelta(days=7)
+    return start_dt, end_dt
 
-    query = select(models.StationSensorLatencyPostgreSQL).where(
-        models.StationSensorLatencyPostgreSQL.sta == sta,
-        models.StationSensorLatencyPostgreSQL.channel == channel,
-        models.StationSensorLatencyPostgreSQL.datetime.between(start_dt, end_dt)
-    )
-    latencies = db.execute(query).scalars().all()
-    if not latencies:
-        raise HTTPException(
-            status_code=404,
-            detail="Latency data not available for the specified station, channel, and date range."
-        )
-    return {item.datetime: item.latency if item.latency is not None else -1 for item in latencies}
+# Missing latency samples are reported as -1
+_LATENCY_OR_MISSING = func.coalesce(models.StationSensorLatencyPostgreSQL.latency, -1).label("latency")
+_LATENCY_IN_WINDOW = models.StationSensorLatencyPostgreSQL.datetime.between(
+    bindparam("start_dt"), bindparam("end_dt")
+)
+_LATENCY_BY_CHANNEL_STMT = select(
+    models.StationSensorLatencyPostgreSQL.datetime,
+    _LATENCY_OR_MISSING
+).where(
+    models.StationSensorLatencyPostgreSQL.sta == bindparam("sta"),
+    models.StationSensorLatencyPostgreSQL.channel == bindparam("channel"),
+    _LATENCY_IN_WINDOW
+)
+_LATENCY_BY_CHANNELS_STMT = select(
+    models.StationSensorLatencyPostgreSQL.channel,
+    models.StationSensorLatencyPostgreSQL.datetime,
+    _LATENCY_OR_MISSING
+).where(
+    models.StationSensorLatencyPostgreSQL.sta == bindparam("sta"),
+    models.StationSensorLatencyPostgreSQL.channel.in_(bindparam("channels", expanding=True)),
+    _LATENCY_IN_WINDOW
+)
 
+def get_latency_by_station_channel(
+    db: Session,
+    sta: str,
+    channel: str,
+    start_dt: Optional[datetime_cls],
+    end_dt: Optional[datetime_cls],
+    epoch_ms: bool = False
+) -> Dict[Union[datetime_cls, int], int]:
+    """Retrieves latency data with robust date filtering; empty if there is none in the range."""
+    start_dt, end_dt = _latency_window(start_dt, end_dt)
+
+    # Only (datetime, latency) pairs are selected, with missing latencies already mapped
+    # to -1 in SQL, so the rows are fed straight into dict() without per-row Python code.
+    rows = db.execute(
+        _LATENCY_BY_CHANNEL_STMT,
+        {"sta": sta, "channel": channel, "start_dt": start_dt, "end_dt": end_dt}
+    ).tuples()
+    if epoch_ms:
+        return {to_epoch_ms(dt): latency for dt, latency in rows}
+    return dict(rows.all())
 
+def get_latency_by_station_channels(
+    db: Session,
+    sta: str,
+    channels: List[str],
+    start_dt: Optional[datetime_cls],
+    end_dt: Optional[datetime_cls],
+    epoch_ms: bool = False
+) -> Dict[str, Dict[Union[datetime_cls, int], int]]:
+    """
+    Retrieves latency data for several channels of one station in a single range query,
+    grouped as {channel: {datetime: latency}}. Every requested channel is present in the
+    result, with an empty series if it has no rows in the range.
+    """
+    start_dt, end_dt = _latency_window(start_dt, end_dt)
+
+    rows = db.execute(
+        _LATENCY_BY_CHANNELS_STMT,
+        {"sta": sta, "channels": channels, "start_dt": start_dt, "end_dt": end_dt}
+    )
+    by_channel: Dict[str, Dict[Union[datetime_cls, int], int]] = {channel: {} for channel in channels}
+    for channel, dt, latency in rows:
+        key = to_epoch_ms(dt) if epoch_ms else dt
+        by_channel[channel][key] = latency
+    return by_channel
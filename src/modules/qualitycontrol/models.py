@@ -1,4 +1,4 @@
-from sqlalchemy import BigInteger, Column, ForeignKey,  String, Date, Float, ForeignKeyConstraint, String, Numeric, Integer
+from sqlalchemy import BigInteger, Column, ForeignKey,  String, Date, Float, ForeignKeyConstraint, Index, String, Numeric, Integer
 from sqlalchemy.orm import relationship
 from src.core.database import Base_mysql, Base_pg
 
@@ -9,6 +9,10 @@ class StationsDataQualityPostgreSQL(Base_pg):
     __table_args__ = (
         ForeignKeyConstraint(['code'], ['stations.code']),
         ForeignKeyConstraint(['code'], ['stations_site_quality.code']),
+        # Yearly quality history per station (code = :c AND date BETWEEN ...)
+        Index("ix_data_quality_code_date", "code", "date"),
+        # Daily summary across all stations (date = :d)
+        Index("ix_data_quality_date_code", "date", "code"),
     )
 
     id = Column(BigInteger, primary_key=True, autoincrement=True)
@@ -18,20 +22,33 @@ class StationsDataQualityPostgreSQL(Base_pg):
     result = Column(String)
     details = Column(String)
 
+    # Never lazy-loaded: a query that needs these must opt in with an eager loader option,
+    # so an unplanned access raises instead of issuing one query per row.
     station_metadata = relationship("MetadataPostgreSQL", 
                                     back_populates="data_quality", 
                                     primaryjoin="StationsDataQualityPostgreSQL.code == MetadataPostgreSQL.code",
-                                    overlaps="data_quality")
+                                    overlaps="data_quality",
+                                    lazy="raise_on_sql")
     station_site_quality = relationship("StationSiteQualityPostgreSQL", 
                                         back_populates="data_quality",
                                           primaryjoin="StationsDataQualityPostgreSQL.code == StationSiteQualityPostgreSQL.code",
-                                          overlaps="data_quality,station_metadata")
+                                          overlaps="data_quality,station_metadata",
+                                          lazy="raise_on_sql")
 
     def __repr__(self):
         return f"<StationsDataQuality(code={self.code}, quality_percentage={self.quality_percentage}, result='{self.result}')>"
     
 class StationsQCDetailsPostgreSQL(Base_pg):
     __tablename__ = 'stations_qc_details'
+    __table_args__ = (
+        # Per-station date-range lookups (availability, details by code and date)
+        Index("ix_qc_details_code_date", "code", "date"),
+        # /data/detail/All/{date}: serves only the date filter; the component-ranked ORDER BY
+        # is sorted by PostgreSQL (see _QC_DETAILS_ALL_STMT)
+        Index("ix_qc_details_date_code_channel", "date", "code", "channel"),
+        # Compact range index for all-station date scans; rows are appended in date order
+        Index("ix_qc_details_date_brin", "date", postgresql_using="brin", postgresql_with={"pages_per_range": 32}),
+    )
 
     # All columns are marked 'Not NULL' in your image.
     # 'id' is also marked 'Primary key'.
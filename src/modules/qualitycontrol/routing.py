@@ -1,8 +1,11 @@
+import os
 from datetime import date, timedelta
 from typing import List, Dict
-from fastapi import APIRouter
+from fastapi import APIRouter, Request, Response
 from fastapi.responses import FileResponse
+from src.core.config import settings
 from src.core.dependencies import DbPg
+from src.core.responses import ORJSONUTCResponse, adapter_json_response
 from src.modules.qualitycontrol import services
 from . import schemas
 from ..metadata import schemas as metadata_schemas
@@ -10,18 +13,39 @@ from src.auth.dependencies import qc_read_required
 
 router = APIRouter()
 
+# Images sit behind authentication, so only the client (not shared caches) may store them
+IMAGE_CACHE_CONTROL = f"private, max-age={settings.IMAGE_CACHE_MAX_AGE_SECONDS}"
+
+def _image_response(request: Request, file_path: str, stat_result: os.stat_result) -> Response:
+    """
+    Serves a PNG with caching headers. The stat result from the path lookup is reused for
+    the ETag/Last-Modified headers, and a matching If-None-Match is answered with 304.
+    """
+    response = FileResponse(
+        file_path,
+        media_type="image/png",
+        headers={"Cache-Control": IMAGE_CACHE_CONTROL},
+        stat_result=stat_result,
+    )
+    etag = response.headers["etag"]
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in (tag.strip() for tag in if_none_match.split(","))):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": IMAGE_CACHE_CONTROL})
+    return response
+
 @router.get(
     "/data/summary/{date_str}",
     response_model=List[schemas.QcResultSummaryResponseBase],
     dependencies=[qc_read_required],
     summary="Get Daily Quality Summary"
 )
-async def get_summary(
+def get_summary(
     db: DbPg,
     date_str: date = date.today() - timedelta(days=1),
 ):
     """Retrieves a summary of quality control results for all stations on a specific date."""
-    return services.get_qc_summary_by_date(db, summary_date=date_str)
+    summaries = services.get_qc_summary_by_date(db, summary_date=date_str)
+    return adapter_json_response(schemas.QcSummaryListAdapter, summaries)
 
 @router.get(
     "/data/detail/{code}/{date_str}",
@@ -29,13 +53,17 @@ async def get_summary(
     dependencies=[qc_read_required],
     summary="Get QC Details by Station Code and Date"
 )
-async def get_qc_details_by_code_and_date(
+def get_qc_details_by_code_and_date(
     db: DbPg,
     code: str,
     date_str: date,
 ):
     """Retrieves detailed quality control information for a specific station (or 'All') on a given date."""
-    return services.get_sorted_qc_details(db, station_code=code, detail_date=date_str)
+    qc_details = services.get_sorted_qc_details(db, station_code=code, detail_date=date_str)
+    return adapter_json_response(
+        schemas.QcDetailsListAdapter,
+        schemas.QcDetailsListAdapter.validate_python(qc_details, from_attributes=True),
+    )
 
 @router.get(
     "/data/history/{code}/{year}",
@@ -43,13 +71,14 @@ async def get_qc_details_by_code_and_date(
     dependencies=[qc_read_required],
     summary="Get Quality History for a Station and Year"
 )
-async def get_quality_history(
+def get_quality_history(
     db: DbPg,
     code: str,
     year: int,
 ):
     """Retrieves the quality history for a specific station over a given year."""
-    return services.get_station_quality_history(db, station_code=code, year=year)
+    history = services.get_station_quality_history(db, station_code=code, year=year)
+    return adapter_json_response(schemas.QualityHistoryAdapter, history)
 
 @router.get(
     "/site/summary",
@@ -57,9 +86,9 @@ async def get_quality_history(
     dependencies=[qc_read_required],
     summary="Retrieve All Station Site Quality Data"
 )
-async def get_all_station_site_qualities(db: DbPg):
+def get_all_station_site_qualities(db: DbPg):
     """Retrieves a list of all station site quality records from the database."""
-    return services.get_all_site_qualities(db)
+    return adapter_json_response(schemas.SiteQualityListAdapter, services.get_all_site_qualities(db))
 
 @router.get(
     "/site/detail/{code}",
@@ -67,12 +96,15 @@ async def get_all_station_site_qualities(db: DbPg):
     dependencies=[qc_read_required],
     summary="Get Site Details by Station Code"
 )
-async def get_site_details_by_code(
+def get_site_details_by_code(
     db: DbPg,
     code: str,
 ):
     """Retrieves site-specific details for a given station code."""
-    return services.get_site_quality_by_code(db, station_code=code)
+    return adapter_json_response(
+        schemas.SiteQualityListAdapter,
+        services.get_site_quality_by_code(db, station_code=code),
+    )
 
 @router.get(
     "/data/psd/{date_str}/{code}/{channel}",
@@ -80,14 +112,15 @@ async def get_site_details_by_code(
     dependencies=[qc_read_required],
     summary="Get Power Spectral Density (PSD) Image"
 )
-async def get_psd_image(
+def get_psd_image(
+    request: Request,
     date_str: date,
     code: str,
     channel: str
 ):
     """Retrieves a securely located Power Spectral Density (PSD) image."""
-    file_path = services.get_image_filepath("psd", image_date=date_str, code=code, channel=channel)
-    return FileResponse(file_path)
+    file_path, stat_result = services.get_image_filepath("psd", image_date=date_str, code=code, channel=channel)
+    return _image_response(request, file_path, stat_result)
 
 @router.get(
     "/data/signal/{date_str}/{code}/{channel}",
@@ -95,14 +128,15 @@ async def get_psd_image(
     dependencies=[qc_read_required],
     summary="Get Signal Image"
 )
-async def get_signal_image(
+def get_signal_image(
+    request: Request,
     date_str: date,
     code: str,
     channel: str
 ):
     """Retrieves a securely located signal image."""
-    file_path = services.get_image_filepath("signal", image_date=date_str, code=code, channel=channel)
-    return FileResponse(file_path)
+    file_path, stat_result = services.get_image_filepath("signal", image_date=date_str, code=code, channel=channel)
+    return _image_response(request, file_path, stat_result)
 
 @router.get(
     "/data/availability/{station_code}", # The year is removed from the path
@@ -132,11 +166,8 @@ def get_station_availability_endpoint(
         "count": len(data_list)
     }
 
-    # 3. Return the final response
-    return {
-        "meta": meta_data,
-        "data": data_list
-    }
+    # The days hold only strings, so orjson encodes them directly without a Pydantic pass
+    return ORJSONUTCResponse({"meta": meta_data, "data": data_list})
 
 @router.get(
     "/data/availability/",  # Note: The path is now at the root level without a station code
@@ -154,18 +185,16 @@ def get_all_stations_availability_endpoint(
     date range, pivoted by channel for each day. The result is a dictionary
     keyed by station code.
     """
-    data_dict = services.get_all_stations_availability_by_date(
+    data_json, station_count, total_records = services.get_all_stations_availability_by_date(
         db=db,
         start_date=start_date,
         end_date=end_date
     )
 
-    # Calculate total records across all stations for metadata
-    total_records = sum(len(v) for v in data_dict.values())
-
-    meta_data = {
-        "stationCount": len(data_dict),
+    # The data object arrives already serialized by PostgreSQL; only the meta is encoded here
+    meta = schemas.AllStationsAvailabilityMeta.model_validate({
+        "stationCount": station_count,
         "totalRecords": total_records
-    }
-
-    return {"meta": meta_data, "data": data_dict}
\ No newline at end of file
+    })
+    body = b'{"meta":' + meta.model_dump_json(by_alias=True).encode() + b',"data":' + data_json + b"}"
+    return Response(content=body, media_type="application/json")
\ No newline at end of file
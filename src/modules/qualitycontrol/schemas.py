@@ -1,157 +1,68 @@
-from pydantic import BaseModel, Field, condecimal, computed_field, ConfigDict
-from typing import Optional, List, Annotated, Dict
+from pydantic import BaseModel, Field, TypeAdapter, condecimal, ConfigDict
+from typing import Any, Optional, List, Annotated, Dict
 from decimal import Decimal
-from datetime import datetime as datetime_cls, date as date_cls
-from ..metadata.schemas import MetadataPostgreSQLBase, StationSiteQualityBase
+from datetime import datetime as datetime_cls, date as date_cls, time as time_cls
+from ..metadata.schemas import GeometryBase, StationSiteQualityBase, point_geometry
 
 
 ## Response Schemas ##
 
-class GeometryBase(BaseModel):
-    """
-    **Geometry Model for Geographic Coordinates**
-
-    This schema defines a standard representation for geographic point data,
-    typically used to describe the location of a station or sensor.
-
-    Attributes:
-    - **type** (`str`): The type of geometry. For a single location, this is typically "Point".
-    - **coordinates** (`List[float]`): A list representing the geographic coordinates.
-      It follows the [longitude, latitude] order, consistent with GeoJSON standards.
-      An optional third element can represent altitude.
-
-    Example:
-    ```json
-    {
-      "type": "Point",
-      "coordinates": [106.8271, -6.1745, 1.0]
-    }
-    ```
-    """
-    type: str = Field(..., description="Type of geometry, e.g., 'Point'")
-    coordinates: List[float] = Field(..., description="List of coordinates [longitude, latitude, (optional) altitude]")
-    
 class QcResultSummaryResponseBase(BaseModel):
     """
     **QC Result Summary Response Model**
 
     This schema provides a summarized overview of Quality Control (QC) results for a station
     on a specific date. It integrates core QC metrics with related station metadata and
-    site quality information, utilizing computed fields to flatten data from nested objects.
+    site quality information as flat fields, filled once per row by `from_row`.
 
     Attributes:
-    - **station_metadata** (`MetadataPostgreSQLBase`): Internal field representing the full PostgreSQL metadata. Excluded from direct JSON output.
-    - **station_site_quality** (`StationSiteQualityBase`): Internal field representing the full station site quality data. Excluded from direct JSON output.
     - **date** (`datetime_cls`): The date for which the QC summary applies.
     - **code** (`str`): The unique station code.
     - **quality_percentage** (`float`): The overall data quality percentage for the given date.
     - **result** (`str`): A textual summary of the QC result (e.g., "Good", "Poor", "Missing").
     - **details** (`str`): More detailed information or remarks about the QC result.
-
-    Computed Fields:
-    - **network** (`Optional[str]`): The seismic network of the station, derived from `station_metadata`.
-    - **site_quality** (`Optional[str]`): The overall site quality description, derived from `station_site_quality`.
-    - **network_group** (`Optional[str]`): The broader network grouping, derived from `station_metadata`.
-    - **balai** (`Optional[int]`): The Balai (regional office) identifier, derived from `station_metadata`.
-    - **upt** (`Optional[str]`): The UPT (Technical Implementation Unit) identifier, derived from `station_metadata`.
-    - **communication** (`Optional[str]`): The communication type used by the station, derived from `station_metadata`.
-    - **digitizer** (`Optional[str]`): The digitizer type used at the station, derived from `station_metadata`.
-    - **year** (`Optional[str]`): The year of station installation, derived from `station_metadata`.
-    - **geometry** (`Optional[GeometryBase]`): The geographic coordinates of the station as a `Point` geometry, derived from `station_metadata`.
-
-    Config:
-    - `from_attributes = True`: Enables mapping from ORM models (SQLAlchemy) to Pydantic models.
+    - **network** (`Optional[str]`): The seismic network of the station, from the station metadata.
+    - **site_quality** (`Optional[str]`): The overall site quality description, from the station site quality.
+    - **network_group** (`Optional[str]`): The broader network grouping, from the station metadata.
+    - **balai** (`Optional[int]`): The Balai (regional office) identifier, from the station metadata.
+    - **upt** (`Optional[str]`): The UPT (Technical Implementation Unit) identifier, from the station metadata.
+    - **communication** (`Optional[str]`): The communication type used by the station, from the station metadata.
+    - **digitizer** (`Optional[str]`): The digitizer type used at the station, from the station metadata.
+    - **year** (`Optional[int]`): The year of station installation, from the station metadata.
+    - **geometry** (`Optional[GeometryBase]`): The geographic coordinates of the station as a `Point` geometry, from the station metadata.
     """
-    station_metadata: MetadataPostgreSQLBase = Field(..., exclude=True, description="Internal field for PostgreSQL station metadata (not directly serialized)")
-    station_site_quality: StationSiteQualityBase = Field(..., exclude=True, description="Internal field for station site quality data (not directly serialized)")
-
     date: datetime_cls = Field(..., description="The date for which the QC summary applies")
     code: str = Field(..., description="The unique station code")
     quality_percentage: float = Field(..., description="The overall data quality percentage for the given date")
     result: str = Field(..., description="A textual summary of the QC result (e.g., 'Good', 'Poor', 'Missing')")
     details: str = Field(..., description="More detailed information or remarks about the QC result")
-    
-    @computed_field
-    @property
-    def network(self) -> Optional[str]:
-        """The seismic network of the station, derived from station_metadata."""
-        if hasattr(self, 'station_metadata') and self.station_metadata:
-            return self.station_metadata.network
-        return None
-    
-    @computed_field
-    @property
-    def site_quality(self) -> Optional[str]:
-        """The overall site quality description, derived from station_site_quality."""
-        if hasattr(self, 'station_site_quality') and self.station_site_quality:
-            return self.station_site_quality.site_quality
-        return None
-    
-    @computed_field
-    @property
-    def network_group(self) -> Optional[str]:
-        """The broader network grouping, derived from station_metadata."""
-        if hasattr(self, 'station_metadata') and self.station_metadata:
-            return self.station_metadata.network_group
-        return None
-
-    @computed_field
-    @property
-    def balai(self) -> Optional[int]:
-        """The Balai (regional office) identifier, derived from station_metadata."""
-        if hasattr(self, 'station_metadata') and self.station_metadata:
-            return self.station_metadata.balai
-        return None
-
-    @computed_field
-    @property
-    def upt(self) -> Optional[str]:
-        """The UPT (Technical Implementation Unit) identifier, derived from station_metadata."""
-        if hasattr(self, 'station_metadata') and self.station_metadata:
-            return self.station_metadata.upt
-        return None
-
-    @computed_field
-    @property
-    def communication(self) -> Optional[str]:
-        """The communication type used by the station, derived from station_metadata."""
-        if hasattr(self, 'station_metadata') and self.station_metadata:
-            return self.station_metadata.communication_type
-        return None
-    
-    @computed_field
-    @property
-    def digitizer(self) -> Optional[str]:
-        """The digitizer type used at the station, derived from station_metadata."""
-        if hasattr(self, 'station_metadata') and self.station_metadata:
-            return self.station_metadata.digitizer_type
-        return None
-    
-    @computed_field
-    @property
-    def year(self) -> Optional[int]:
-        """The year of station installation, derived from station_metadata."""
-        if hasattr(self, 'station_metadata') and self.station_metadata:
-            return self.station_metadata.year
-        return None
-    
-    @computed_field
-    @property
-    def geometry(self) -> Optional[GeometryBase]:
+    network: Optional[str] = Field(None, description="The seismic network of the station")
+    site_quality: Optional[str] = Field(None, description="The overall site quality description")
+    network_group: Optional[str] = Field(None, description="The broader network grouping")
+    balai: Optional[int] = Field(None, description="The Balai (regional office) identifier")
+    upt: Optional[str] = Field(None, description="The UPT (Technical Implementation Unit) identifier")
+    communication: Optional[str] = Field(None, description="The communication type used by the station")
+    digitizer: Optional[str] = Field(None, description="The digitizer type used at the station")
+    year: Optional[int] = Field(None, description="The year of station installation")
+    geometry: Optional[GeometryBase] = Field(None, description="The geographic coordinates of the station as a Point geometry")
+
+    @classmethod
+    def from_row(cls, row: Any) -> "QcResultSummaryResponseBase":
         """
-        The geographic coordinates of the station as a Point geometry,
-        derived from station_metadata's latitude and longitude.
+        Builds the summary from a flat row mapping carrying the QC result columns, the
+        metadata/site-quality columns under their response names, and `latitude`/`longitude`.
         """
-        if hasattr(self, 'station_metadata') and self.station_metadata:
-            if self.station_metadata.latitude is not None and self.station_metadata.longitude is not None:
-                return GeometryBase(
-                    type="Point",
-                    coordinates=[float(self.station_metadata.longitude), float(self.station_metadata.latitude), 1.0]
-                )
-        return None
-
-    class Config:
-        from_attributes = True
+        values = dict(row)
+        summary_date = values["date"]
+        if not isinstance(summary_date, datetime_cls):
+            # Date columns are reported as midnight datetimes, as validation would do
+            values["date"] = datetime_cls.combine(summary_date, time_cls.min)
+        latitude, longitude = values.pop("latitude"), values.pop("longitude")
+        values["geometry"] = (
+            point_geometry(longitude, latitude)
+            if latitude is not None and longitude is not None else None
+        )
+        return cls.model_construct(**values)
 
 class StationsQCDetailsResponseBase(BaseModel):
     """
@@ -273,4 +184,13 @@ class AllStationsAvailabilityResponse(BaseModel):
     - **data** (`Dict[str, List[DataItemSchemas]]`): A dictionary of station data.
     """
     meta: AllStationsAvailabilityMeta
-    data: Dict[str, List[DataItemSchemas]]
\ No newline at end of file
+    data: Dict[str, List[DataItemSchemas]]
+
+
+## Type Adapters ##
+# Built once at import; routes use them to serialize a whole response body in a single
+# pass instead of going through FastAPI's response_model encoding per request.
+QcSummaryListAdapter = TypeAdapter(List[QcResultSummaryResponseBase])
+QcDetailsListAdapter = TypeAdapter(List[StationsQCDetailsResponseBase])
+QualityHistoryAdapter = TypeAdapter(Dict[str, int])
+SiteQualityListAdapter = TypeAdapter(List[StationSiteQualityBase])
@@ -1,42 +1,106 @@
 import logging
 import os
+import re
+import threading
+import time
+import orjson
+from cachetools import TTLCache
 from datetime import date
-from typing import Dict, List, Any
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
 from fastapi import HTTPException, status
-from sqlalchemy import select
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import Text, bindparam, case, cast, func, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.orm import Session, joinedload, raiseload
 from src.core.config import settings
 from . import models
 from ..metadata import models as metadata_models
-from .schemas import StationsQCDetailsResponseBase, DataItemSchemas
+from ..metadata.schemas import StationSiteQualityBase
+from .schemas import QcResultSummaryResponseBase, SiteQualityListAdapter, StationsQCDetailsResponseBase, DataItemSchemas
 
 logger = logging.getLogger(__name__)
 
-def get_qc_summary_by_date(db: Session, summary_date: date) -> List[models.StationsDataQualityPostgreSQL]:
-    """Fetches the QC summary for all stations on a given date."""
-    query = (
-        select(models.StationsDataQualityPostgreSQL)
-        .options(
-            joinedload(models.StationsDataQualityPostgreSQL.station_metadata),
-            joinedload(models.StationsDataQualityPostgreSQL.station_site_quality)
+def _qc_summary_stmt():
+    """
+    One flat row per QC result with the station metadata and site quality columns it is
+    summarized with, labelled as the response fields (plus latitude/longitude for geometry).
+    """
+    dq = models.StationsDataQualityPostgreSQL
+    meta = metadata_models.MetadataPostgreSQL
+    site = metadata_models.StationSiteQualityPostgreSQL
+    return (
+        select(
+            dq.date, dq.code, dq.quality_percentage, dq.result, dq.details,
+            meta.network,
+            site.site_quality,
+            meta.network_group,
+            meta.balai,
+            meta.upt,
+            meta.communication_type.label("communication"),
+            meta.digitizer_type.label("digitizer"),
+            meta.year,
+            meta.latitude,
+            meta.longitude,
         )
-        .where(models.StationsDataQualityPostgreSQL.date == summary_date)
+        .outerjoin(meta, meta.code == dq.code)
+        .outerjoin(site, site.code == dq.code)
     )
-    data = db.execute(query).scalars().all()
-    if not data:
+
+# Statements below are built once at import; per-request values are bind parameters
+_QC_SUMMARY_BY_DATE_STMT = _qc_summary_stmt().where(
+    models.StationsDataQualityPostgreSQL.date == bindparam("summary_date")
+)
+
+def get_qc_summary_by_date(db: Session, summary_date: date) -> List[QcResultSummaryResponseBase]:
+    """Fetches the QC summary for all stations on a given date."""
+    rows = db.execute(_QC_SUMMARY_BY_DATE_STMT, {"summary_date": summary_date}).mappings().all()
+    if not rows:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"No quality summary data found for date '{summary_date.isoformat()}'."
         )
-    return data
+    return [QcResultSummaryResponseBase.from_row(row) for row in rows]
+
+# Channels are listed E, N, Z, then anything else, by the component letter at the end
+_CHANNEL_COMPONENT_RANK = case(
+    {"E": 0, "N": 1, "Z": 2},
+    value=func.upper(func.right(models.StationsQCDetailsPostgreSQL.channel, 1)),
+    else_=3,
+)
+
+# "All" is a sentinel for every station on the date. The (date, code, channel) index
+# serves only the date filter: the component rank leads the ORDER BY, so PostgreSQL
+# sorts the day's rows itself. That sort is intended; one day is small.
+_QC_DETAILS_ALL_STMT = (
+    select(models.StationsQCDetailsPostgreSQL)
+    .where(models.StationsQCDetailsPostgreSQL.date == bindparam("detail_date"))
+    .order_by(
+        _CHANNEL_COMPONENT_RANK,
+        models.StationsQCDetailsPostgreSQL.code,
+        models.StationsQCDetailsPostgreSQL.channel
+    )
+    .options(raiseload("*"))
+)
+_QC_DETAILS_BY_CODE_STMT = (
+    select(models.StationsQCDetailsPostgreSQL)
+    .where(
+        models.StationsQCDetailsPostgreSQL.code == bindparam("station_code"),
+        models.StationsQCDetailsPostgreSQL.date == bindparam("detail_date")
+    )
+    .order_by(_CHANNEL_COMPONENT_RANK, models.StationsQCDetailsPostgreSQL.channel)
+    .options(raiseload("*"))
+)
 
 def get_sorted_qc_details(db: Session, station_code: str, detail_date: date) -> List[StationsQCDetailsResponseBase]:
-    """Fetches and sorts QC details for a specific station or all stations on a given date."""
-    query = select(models.StationsQCDetailsPostgreSQL).where(models.StationsQCDetailsPostgreSQL.date == detail_date)
-    if station_code.lower() != "all":
-        query = query.where(models.StationsQCDetailsPostgreSQL.code == station_code)
-    
-    qc_details = db.execute(query).scalars().all()
+    """
+    Fetches QC details for a specific station or all stations on a given date, sorted by
+    PostgreSQL by channel component (E, N, Z, others).
+    """
+    if station_code.lower() == "all":
+        result = db.execute(_QC_DETAILS_ALL_STMT, {"detail_date": detail_date})
+    else:
+        result = db.execute(_QC_DETAILS_BY_CODE_STMT, {"station_code": station_code, "detail_date": detail_date})
+    qc_details = result.scalars().all()
 
     if not qc_details:
         raise HTTPException(
@@ -44,40 +108,92 @@ def get_sorted_qc_details(db: Session, station_code: str, detail_date: date) ->
             detail=f"No QC details found for code '{station_code}' on date '{detail_date.isoformat()}'"
         )
 
-    def sort_key(item: StationsQCDetailsResponseBase):
-        channel_last_char = item.channel[-1].upper() if item.channel else ''
-        return {'E': 0, 'N': 1, 'Z': 2}.get(channel_last_char, 3)
+    return qc_details
 
-    return sorted(qc_details, key=sort_key)
+# --- Quality History Cache ---
+# Past years no longer change, so their histories are kept longer than the current
+# year's, which gains a row per day. Keyed by (station_code, year); 404s are not cached.
+_past_history_cache: TTLCache = TTLCache(maxsize=4096, ttl=settings.QUALITY_HISTORY_CACHE_TTL_SECONDS)
+_current_history_cache: TTLCache = TTLCache(maxsize=1024, ttl=settings.QUALITY_HISTORY_CURRENT_YEAR_CACHE_TTL_SECONDS)
+_history_cache_lock = threading.Lock()
 
 def get_station_quality_history(db: Session, station_code: str, year: int) -> Dict[str, int]:
+    """Returns the yearly quality history for a single station, cached per (station, year)."""
+    cache = _current_history_cache if year >= date.today().year else _past_history_cache
+    key = (station_code, year)
+    with _history_cache_lock:
+        history = cache.get(key)
+    if history is None:
+        history = _load_station_quality_history(db, station_code, year)
+        with _history_cache_lock:
+            cache[key] = history
+    return history
+
+# Score reported in the quality history for each QC result; unknown results score 0
+QUALITY_RESULT_SCORES: Dict[str, int] = {"Baik": 4, "Cukup Baik": 3, "Buruk": 2, "Mati": 1}
+
+# PostgreSQL returns (ISO date string, score) pairs, so the history is built by dict()
+# without formatting a date or looking up a score per row in Python
+_QUALITY_HISTORY_STMT = select(
+    func.to_char(models.StationsDataQualityPostgreSQL.date, "YYYY-MM-DD"),
+    case(QUALITY_RESULT_SCORES, value=models.StationsDataQualityPostgreSQL.result, else_=0)
+).where(
+    models.StationsDataQualityPostgreSQL.code == bindparam("station_code"),
+    models.StationsDataQualityPostgreSQL.date.between(bindparam("start_date"), bindparam("end_date"))
+)
+
+def _load_station_quality_history(db: Session, station_code: str, year: int) -> Dict[str, int]:
     """Compiles a yearly quality history for a single station."""
     start_date = date(year, 1, 1)
     end_date = date(year, 12, 31)
 
-    query = select(models.StationsDataQualityPostgreSQL).where(
-        models.StationsDataQualityPostgreSQL.code == station_code,
-        models.StationsDataQualityPostgreSQL.date.between(start_date, end_date)
-    )
-    records = db.execute(query).scalars().all()
+    history_dict = dict(db.execute(
+        _QUALITY_HISTORY_STMT,
+        {"station_code": station_code, "start_date": start_date, "end_date": end_date}
+    ).tuples().all())
 
-    if not records:
+    if not history_dict:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"No quality history found for station '{station_code}' in year {year}"
         )
-
-    result_map = {"Baik": 4, "Cukup Baik": 3, "Buruk": 2, "Mati": 1}
-    history_dict = {
-        record.date.isoformat(): result_map.get(record.result, 0)
-        for record in records
-    }
     return history_dict
 
-def get_site_quality_by_code(db: Session, station_code: str) -> List[metadata_models.StationSiteQualityPostgreSQL]:
+# StationSiteQualityBase reads station_metadata for its geometry, so it is loaded in the
+# same query; any other relationship access raises instead of issuing a query per row.
+_SITE_QUALITY_LOADER_OPTIONS = (
+    joinedload(metadata_models.StationSiteQualityPostgreSQL.station_metadata),
+    raiseload("*"),
+)
+
+# --- Site Quality Snapshot ---
+# Station siting data is near-static, so the whole table is loaded as response models
+# and served from memory, with a per-code index, until the snapshot is older than the TTL.
+_site_quality_snapshot: Optional[Tuple[float, List[StationSiteQualityBase], Dict[str, List[StationSiteQualityBase]]]] = None
+_site_quality_lock = threading.Lock()
+
+def _get_site_quality_snapshot(db: Session) -> Tuple[List[StationSiteQualityBase], Dict[str, List[StationSiteQualityBase]]]:
+    """Returns all site quality records and their by-code index, reloading them when stale."""
+    global _site_quality_snapshot
+    snapshot = _site_quality_snapshot
+    if snapshot is None or time.monotonic() - snapshot[0] >= settings.SITE_QUALITY_CACHE_TTL_SECONDS:
+        with _site_quality_lock:
+            snapshot = _site_quality_snapshot
+            if snapshot is None or time.monotonic() - snapshot[0] >= settings.SITE_QUALITY_CACHE_TTL_SECONDS:
+                rows = db.execute(
+                    select(metadata_models.StationSiteQualityPostgreSQL).options(*_SITE_QUALITY_LOADER_OPTIONS)
+                ).scalars().all()
+                sites = SiteQualityListAdapter.validate_python(rows, from_attributes=True)
+                by_code: Dict[str, List[StationSiteQualityBase]] = {}
+                for site in sites:
+                    by_code.setdefault(site.code, []).append(site)
+                snapshot = (time.monotonic(), sites, by_code)
+                _site_quality_snapshot = snapshot
+    return snapshot[1], snapshot[2]
+
+def get_site_quality_by_code(db: Session, station_code: str) -> List[StationSiteQualityBase]:
     """Retrieves site-specific details for a given station code."""
-    query = select(metadata_models.StationSiteQualityPostgreSQL).where(metadata_models.StationSiteQualityPostgreSQL.code == station_code)
-    site_details = db.execute(query).scalars().all()
+    site_details = _get_site_quality_snapshot(db)[1].get(station_code)
     if not site_details:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -85,9 +201,9 @@ def get_site_quality_by_code(db: Session, station_code: str) -> List[metadata_mo
         )
     return site_details
 
-def get_all_site_qualities(db: Session) -> List[metadata_models.StationSiteQualityPostgreSQL]:
+def get_all_site_qualities(db: Session) -> List[StationSiteQualityBase]:
     """Retrieves all records from the stations_site_quality table."""
-    stations = db.execute(select(metadata_models.StationSiteQualityPostgreSQL)).scalars().all()
+    stations = _get_site_quality_snapshot(db)[0]
     if not stations:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -95,32 +211,59 @@ def get_all_site_qualities(db: Session) -> List[metadata_models.StationSiteQuali
         )
     return stations
 
-def get_image_filepath(image_type: str, image_date: date, code: str, channel: str) -> str:
-    """Constructs and validates a secure file path for an image."""
-    if image_type == "psd":
-        base_path = os.path.join(settings.IMAGE_STORAGE_BASE_PATH, settings.PSD_IMAGE_SUBDIR)
-        filename = f"{code}_{channel}_PDF.png"
-    elif image_type == "signal":
-        base_path = os.path.join(settings.IMAGE_STORAGE_BASE_PATH, settings.SIGNAL_IMAGE_SUBDIR)
-        filename = f"{code}_{channel}_signal.png"
-    else:
+# Image directory (absolute and normalized once at import) and filename suffix per image type
+_IMAGE_LOCATIONS: Dict[str, Tuple[Path, str]] = {
+    "psd": (Path(os.path.abspath(os.path.join(settings.IMAGE_STORAGE_BASE_PATH, settings.PSD_IMAGE_SUBDIR))), "PDF"),
+    "signal": (Path(os.path.abspath(os.path.join(settings.IMAGE_STORAGE_BASE_PATH, settings.SIGNAL_IMAGE_SUBDIR))), "signal"),
+}
+# Station and channel codes are embedded in a single filename; without a path separator
+# they cannot leave the dated image directory.
+_SAFE_CODE_RE = re.compile(r"[A-Za-z0-9_.-]+")
+
+def get_image_filepath(image_type: str, image_date: date, code: str, channel: str) -> Tuple[str, os.stat_result]:
+    """
+    Constructs and validates a secure file path for an image. Returns the path with its
+    stat result, which also serves as the existence check.
+    """
+    location = _IMAGE_LOCATIONS.get(image_type)
+    if location is None:
         logger.error(f"Invalid image type requested: {image_type}")
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid image type specified.")
+    base_path, suffix = location
 
-    if ".." in code or "/" in code or ".." in channel or "/" in channel:
+    if not (_SAFE_CODE_RE.fullmatch(code) and _SAFE_CODE_RE.fullmatch(channel)):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid characters in code or channel.")
-    
-    date_str = image_date.strftime("%Y-%m-%d")
-    full_path = os.path.join(base_path, date_str, filename)
 
-    if not os.path.normpath(full_path).startswith(os.path.normpath(base_path)):
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="File path is outside the allowed directory.")
+    full_path = base_path / image_date.isoformat() / f"{code}_{channel}_{suffix}.png"
 
-    if not os.path.exists(full_path):
+    try:
+        stat_result = full_path.stat()
+    except FileNotFoundError:
         logger.warning(f"Image file not found at path: {full_path}")
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Image file not found.")
 
-    return full_path
+    return str(full_path), stat_result
+
+# A QC date rendered as its midnight ISO timestamp, the availability endpoints' wire format
+_DAY_TIMESTAMP = func.to_char(models.StationsQCDetailsPostgreSQL.date, 'YYYY-MM-DD"T"00:00:00')
+
+_STATION_AVAILABILITY_STMT = (
+    select(
+        _DAY_TIMESTAMP,
+        func.array_agg(aggregate_order_by(
+            models.StationsQCDetailsPostgreSQL.channel, models.StationsQCDetailsPostgreSQL.channel
+        )),
+        func.array_agg(aggregate_order_by(
+            cast(models.StationsQCDetailsPostgreSQL.availability, Text), models.StationsQCDetailsPostgreSQL.channel
+        )),
+    )
+    .where(
+        models.StationsQCDetailsPostgreSQL.code == bindparam("station_code"),
+        models.StationsQCDetailsPostgreSQL.date.between(bindparam("start_date"), bindparam("end_date"))
+    )
+    .group_by(models.StationsQCDetailsPostgreSQL.date)
+    .order_by(models.StationsQCDetailsPostgreSQL.date)
+)
 
 def get_station_availability_by_date(
     db: Session,
@@ -130,80 +273,82 @@ def get_station_availability_by_date(
 ) -> List[Dict[str, Any]]:
     """
     Compiles an availability history for a station within a date range, pivoted by channel.
+    PostgreSQL groups the rows per day and returns the channels with their availabilities
+    as two parallel arrays, so Python only zips each day into a dict. Values come back
+    already in their wire form (ISO timestamp and decimal strings), ready for orjson.
     """
-    query = select(models.StationsQCDetailsPostgreSQL).where(
-        models.StationsQCDetailsPostgreSQL.code == station_code,
-        models.StationsQCDetailsPostgreSQL.date.between(start_date, end_date)
-    ).order_by(models.StationsQCDetailsPostgreSQL.date)
+    rows = db.execute(
+        _STATION_AVAILABILITY_STMT,
+        {"station_code": station_code, "start_date": start_date, "end_date": end_date}
+    ).all()
 
-    records = db.execute(query).scalars().all()
-
-    if not records:
+    if not rows:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"No availability history found for station '{station_code}' between {start_date} and {end_date}"
         )
 
-    grouped_by_date = {}
+    return [
+        {'timestamp': day, **dict(zip(channels, availabilities))}
+        for day, channels, availabilities in rows
+    ]
 
-    for record in records:
-        date_str = record.date.isoformat()
-        
-        if date_str not in grouped_by_date:
-            grouped_by_date[date_str] = {'timestamp': record.date}
-        
-        grouped_by_date[date_str][record.channel] = record.availability
+def _all_stations_availability_stmt():
+    """
+    One row per station: its code, the JSON array of its days (each day an object with the
+    timestamp and every channel's availability, in the existing wire format: midnight ISO
+    timestamps and decimals as strings) and the number of days.
+    """
+    qc_details = models.StationsQCDetailsPostgreSQL
+    daily = (
+        select(
+            qc_details.code,
+            qc_details.date,
+            func.jsonb_build_object("timestamp", _DAY_TIMESTAMP).op("||")(
+                func.jsonb_object_agg(qc_details.channel, cast(qc_details.availability, Text))
+            ).label("entry"),
+        )
+        .where(qc_details.date.between(bindparam("start_date"), bindparam("end_date")))
+        .group_by(qc_details.code, qc_details.date)
+        .subquery("daily")
+    )
+    return (
+        select(
+            daily.c.code,
+            cast(func.jsonb_agg(aggregate_order_by(daily.c.entry, daily.c.date)), Text),
+            func.count(),
+        )
+        .group_by(daily.c.code)
+        .order_by(daily.c.code)
+    )
 
-    return list(grouped_by_date.values())
+_ALL_STATIONS_AVAILABILITY_STMT = _all_stations_availability_stmt()
 
 def get_all_stations_availability_by_date(
     db: Session,
     start_date: date,
     end_date: date
-) -> Dict[str, List[Dict[str, Any]]]:
+) -> Tuple[bytes, int, int]:
     """
-    Compiles an availability history for all stations within a date range.
-    The result is a dictionary with station codes as keys, and the values are
-    lists of availability data, pivoted by channel for each date.
-    """
-    query = select(models.StationsQCDetailsPostgreSQL).where(
-        models.StationsQCDetailsPostgreSQL.date.between(start_date, end_date)
-    ).order_by(models.StationsQCDetailsPostgreSQL.code, models.StationsQCDetailsPostgreSQL.date)
+    Compiles an availability history for all stations within a date range, keyed by
+    station code, with each station's days pivoted by channel.
 
-    records = db.execute(query).scalars().all()
+    PostgreSQL builds the JSON itself: one object per (station, day) holding the
+    timestamp and each channel's availability, aggregated into one array per station.
+    Python only splices those arrays into the top-level object. Returns the serialized
+    `data` object with the station count and the total number of daily records.
+    """
+    parts = []
+    total_records = 0
+    rows = db.execute(_ALL_STATIONS_AVAILABILITY_STMT, {"start_date": start_date, "end_date": end_date})
+    for station_code, entries_json, day_count in rows:
+        parts.append(orjson.dumps(station_code) + b":" + entries_json.encode())
+        total_records += day_count
 
-    if not records:
+    if not parts:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"No availability history found for any station between {start_date} and {end_date}"
         )
 
-    # This will hold the final structured data, e.g., {'STN1': [date_data_1, date_data_2]}
-    all_stations_data = {}
-
-    for record in records:
-        station_code = record.code
-        date_str = record.date.isoformat()
-        
-        # If the station is not yet in our dictionary, add it.
-        # The value will be a dictionary to group records by date string.
-        if station_code not in all_stations_data:
-            all_stations_data[station_code] = {}
-        
-        # Get the dictionary that holds date-grouped data for the current station.
-        station_dates = all_stations_data[station_code]
-        
-        # If the date is not yet a key for the current station, add it.
-        if date_str not in station_dates:
-            station_dates[date_str] = {'timestamp': record.date}
-        
-        # Add the channel availability to the corresponding date entry.
-        station_dates[date_str][record.channel] = record.availability
-
-    # The data is currently grouped like: {'STN1': {'2023-01-01': {...}, '2023-01-02': {...}}}
-    # We need to convert the inner dictionaries of dates into lists.
-    final_result = {}
-    for station_code, dates_dict in all_stations_data.items():
-        final_result[station_code] = list(dates_dict.values())
-
-    return final_result
\ No newline at end of file
+    return b"{" + b",".join(parts) + b"}", len(parts), total_records